@@ -0,0 +1,386 @@
+"""
+Contraction Hierarchies for fast travel-time queries on a static road graph.
+
+Preprocessing contracts the vertices of a routing.Graph one at a time, least
+important first (by edge difference plus contracted neighbors). When a
+vertex v is removed, every path u -> v -> w that is the only shortest way
+from u to w (no witness path avoiding v is found) is replaced by a shortcut
+edge u -> w. Each vertex then keeps only its edges to vertices contracted
+after it: an upward graph for forward edges and one for reversed edges.
+
+A query runs Dijkstra upward from the start in the first and upward from
+the goal in the second. The shortest path meets at its highest vertex, so
+the two searches only touch a few hundred vertices instead of the
+thousands A* explores. Shortcuts remember the vertex they skip, so the
+full path can be unpacked.
+
+Usage: python3 ch.py --graph FILE [--hierarchy FILE] [--queries N]
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import sys
+import time
+from array import array
+
+import roads
+
+MAGIC = b"ROUTECH\0"
+VERSION = 1
+HIERARCHY_SUFFIX = ".ch"
+DIRECTORY_HIERARCHY = "graph.ch"
+
+# Witness searches give up after settling this many vertices; a missed
+# witness only costs an unnecessary shortcut, never a wrong answer
+WITNESS_SETTLE_LIMIT = 500
+
+# arrays stored in a hierarchy file, in order, with their typecodes
+SECTIONS = (
+    ("rank", "i"),
+    ("up_offsets", "q"), ("up_targets", "i"), ("up_weights", "d"), ("up_middles", "i"),
+    ("down_offsets", "q"), ("down_targets", "i"), ("down_weights", "d"), ("down_middles", "i")
+)
+
+
+class ContractionHierarchy():
+    def __init__(self, graph):
+        self.graph = graph
+        self.shortcuts = 0
+        self.build_seconds = 0.0
+        # vertices settled and edges relaxed by the last query
+        self.vertices_explored = 0
+        self.edges_explored = 0
+
+    def build(self):
+        """
+        Orders and contracts every vertex of the graph.
+        """
+        start = time.perf_counter()
+        g = self.graph
+        n = len(g.ids)
+        # remaining graph: out_edges[v][w] and in_edges[w][v] hold the weight
+        # of v -> w, and middle[(v, w)] the vertex a shortcut skips
+        out_edges = [{} for _ in range(n)]
+        in_edges = [{} for _ in range(n)]
+        self.middle = {}
+        for v in range(n):
+            for e in range(g.offsets[v], g.offsets[v + 1]):
+                w = g.targets[e]
+                weight = g.weights[e]
+                if w != v and weight < out_edges[v].get(w, math.inf):
+                    out_edges[v][w] = weight
+                    in_edges[w][v] = weight
+
+        contracted_neighbors = [0] * n
+        rank = array("i", [0] * n)
+        up = [[] for _ in range(n)]
+        down = [[] for _ in range(n)]
+
+        def priority(v):
+            shortcuts = self._shortcuts(v, out_edges, in_edges)
+            return (len(shortcuts) - len(out_edges[v]) - len(in_edges[v])
+                    + contracted_neighbors[v])
+
+        queue = [(priority(v), v) for v in range(n)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            # lazy update: contract v only if it is still the least important
+            p = priority(v)
+            if queue and p > queue[0][0]:
+                heapq.heappush(queue, (p, v))
+                continue
+
+            for u, w, weight in self._shortcuts(v, out_edges, in_edges):
+                if weight < out_edges[u].get(w, math.inf):
+                    out_edges[u][w] = weight
+                    in_edges[w][u] = weight
+                    self.middle[(u, w)] = v
+                    self.shortcuts += 1
+
+            # what is left of v's edges all lead to vertices contracted later
+            rank[v] = order
+            order += 1
+            for w, weight in out_edges[v].items():
+                up[v].append((w, weight, self.middle.get((v, w), -1)))
+                del in_edges[w][v]
+                contracted_neighbors[w] += 1
+            for u, weight in in_edges[v].items():
+                down[v].append((u, weight, self.middle.get((u, v), -1)))
+                del out_edges[u][v]
+                contracted_neighbors[u] += 1
+            out_edges[v] = {}
+            in_edges[v] = {}
+
+        self.rank = rank
+        self.up_offsets, self.up_targets, self.up_weights, self.up_middles = _csr(up)
+        self.down_offsets, self.down_targets, self.down_weights, self.down_middles = _csr(down)
+        self.build_seconds = time.perf_counter() - start
+        return self
+
+    def _shortcuts(self, v, out_edges, in_edges):
+        """
+        Returns the (u, w, weight) shortcuts contracting v needs: paths
+        u -> v -> w with no path from u to w as short that avoids v.
+        """
+        shortcuts = []
+        targets = out_edges[v]
+        for u, in_weight in in_edges[v].items():
+            limit = in_weight + max((weight for w, weight in targets.items() if w != u), default=-1)
+            if limit < 0:
+                continue
+            dist = self._witness(u, v, limit, out_edges)
+            for w, out_weight in targets.items():
+                if w == u:
+                    continue
+                through = in_weight + out_weight
+                if dist.get(w, math.inf) > through:
+                    shortcuts.append((u, w, through))
+        return shortcuts
+
+    def _witness(self, source, avoid, limit, out_edges):
+        """
+        Dijkstra from source in the remaining graph without `avoid`, up to
+        distance `limit` or WITNESS_SETTLE_LIMIT settled vertices.
+        """
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            if d > limit or settled >= WITNESS_SETTLE_LIMIT:
+                break
+            settled += 1
+            for w, weight in out_edges[v].items():
+                if w == avoid:
+                    continue
+                nd = d + weight
+                if nd < dist.get(w, math.inf):
+                    dist[w] = nd
+                    heapq.heappush(heap, (nd, w))
+        return dist
+
+    def query(self, start, to_find):
+        """
+        Returns (path, cost) of the fastest route between two vertex ids,
+        like Graph.astar, or None if there is none.
+        """
+        source = self.graph.index[start]
+        goal = self.graph.index[to_find]
+        dist = ({source: 0.0}, {goal: 0.0})
+        parent = ({source: -1}, {goal: -1})
+        heaps = ([(0.0, source)], [(0.0, goal)])
+        graphs = ((self.up_offsets, self.up_targets, self.up_weights),
+                  (self.down_offsets, self.down_targets, self.down_weights))
+        best = math.inf
+        meet = -1
+        self.vertices_explored = 0
+        self.edges_explored = 0
+
+        while heaps[0] or heaps[1]:
+            # expand the side with the smaller key; stop once neither can
+            # still lead to a shorter path
+            side = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            d, v = heapq.heappop(heaps[side])
+            if d >= best:
+                heaps[side].clear()
+                continue
+            if d > dist[side][v]:
+                continue
+            self.vertices_explored += 1
+
+            other = dist[1 - side].get(v)
+            if other is not None and d + other < best:
+                best = d + other
+                meet = v
+
+            offsets, targets, weights = graphs[side]
+            for e in range(offsets[v], offsets[v + 1]):
+                w = targets[e]
+                nd = d + weights[e]
+                self.edges_explored += 1
+                if nd < dist[side].get(w, math.inf):
+                    dist[side][w] = nd
+                    parent[side][w] = v
+                    heapq.heappush(heaps[side], (nd, w))
+
+        if meet == -1:
+            return None
+
+        # hierarchy path: start ... meet ... goal, then unpack the shortcuts
+        forward = []
+        v = meet
+        while v != -1:
+            forward.append(v)
+            v = parent[0][v]
+        forward.reverse()
+        v = parent[1][meet]
+        while v != -1:
+            forward.append(v)
+            v = parent[1][v]
+
+        path = [forward[0]]
+        for a, b in zip(forward, forward[1:]):
+            self._unpack(a, b, path)
+        return [self.graph.ids[v] for v in path], best
+
+    def _unpack(self, a, b, path):
+        """
+        Appends the vertices of edge a -> b after a to path, expanding
+        shortcuts into the edges they replace.
+        """
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            m = self.middle.get((a, b), -1)
+            if m == -1:
+                path.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+
+    def save(self, path, stamps=None):
+        """
+        Writes the hierarchy's arrays to `path` with roads.write_sections.
+        `stamps` are the roads.source_stamps of the graph it was built from.
+        """
+        header = {
+            "sources": stamps,
+            "vertices": len(self.graph.ids),
+            "edges": len(self.graph.targets),
+            "shortcuts": self.shortcuts,
+            "lengths": [len(getattr(self, name)) for name, _ in SECTIONS]
+        }
+        roads.write_sections(path, MAGIC, VERSION, header,
+                             [getattr(self, name) for name, _ in SECTIONS])
+
+    @classmethod
+    def load(cls, path, graph, stamps=None):
+        """
+        Returns the hierarchy saved at `path` for `graph`, or None if the
+        file is missing, of another version or for a different graph.
+        """
+        def layout(header):
+            if (header["sources"] != stamps or header["vertices"] != len(graph.ids)
+                    or header["edges"] != len(graph.targets)
+                    or len(header["lengths"]) != len(SECTIONS)):
+                return None
+            return [(typecode, count) for (_, typecode), count in zip(SECTIONS, header["lengths"])]
+
+        stored = roads.read_sections(path, MAGIC, VERSION, layout)
+        if stored is None:
+            return None
+        header, arrays = stored
+        hierarchy = cls(graph)
+        hierarchy.shortcuts = header["shortcuts"]
+        for (name, _), values in zip(SECTIONS, arrays):
+            setattr(hierarchy, name, values)
+
+        hierarchy.middle = {}
+        for offsets, targets, middles, upward in (
+                (hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_middles, True),
+                (hierarchy.down_offsets, hierarchy.down_targets, hierarchy.down_middles, False)):
+            for v in range(len(offsets) - 1):
+                for e in range(offsets[v], offsets[v + 1]):
+                    if middles[e] != -1:
+                        edge = (v, targets[e]) if upward else (targets[e], v)
+                        hierarchy.middle[edge] = middles[e]
+        return hierarchy
+
+
+def hierarchy_path(path):
+    """
+    Where the hierarchy of the graph at `path` is saved by default.
+    """
+    if os.path.isdir(path):
+        return os.path.join(path, DIRECTORY_HIERARCHY)
+    return path + HIERARCHY_SUFFIX
+
+
+def _csr(adjacency):
+    """
+    Flattens lists of (target, weight, middle) per vertex into arrays.
+    """
+    offsets = array("q", [0])
+    targets = array("i")
+    weights = array("d")
+    middles = array("i")
+    for edges in adjacency:
+        for w, weight, m in edges:
+            targets.append(w)
+            weights.append(weight)
+            middles.append(m)
+        offsets.append(len(targets))
+    return offsets, targets, weights, middles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contraction Hierarchies query benchmark.")
+    parser.add_argument("--graph", required=True,
+                        help="GraphML file or directory with nodes.csv and edges.csv")
+    parser.add_argument("--hierarchy", help="hierarchy file to load, or to save to after "
+                                            "building (default: FILE.ch, or graph.ch in the directory)")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="random queries to check against A* (default: 200)")
+    args = parser.parse_args()
+
+    graph = roads.load(args.graph)
+    path = args.hierarchy or hierarchy_path(args.graph)
+    stamps = roads.source_stamps(args.graph)
+    hierarchy = ContractionHierarchy.load(path, graph, stamps)
+    if hierarchy is None:
+        hierarchy = ContractionHierarchy(graph).build()
+        print(f"Built in {hierarchy.build_seconds:.2f}s: {len(graph.ids)} vertices, "
+              f"{len(graph.targets)} edges, {hierarchy.shortcuts} shortcuts")
+        try:
+            hierarchy.save(path, stamps)
+        except OSError:
+            # a read-only directory only costs the next run the build
+            print(f"Could not save {path}", file=sys.stderr)
+    else:
+        print(f"Loaded {path}: {hierarchy.shortcuts} shortcuts")
+
+    rng = random.Random(0)
+    pairs = [(rng.choice(graph.ids), rng.choice(graph.ids)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    expected = []
+    astar_vertices = 0
+    for a, b in pairs:
+        result = graph.astar(a, b)
+        expected.append(result)
+        if result is not None:
+            astar_vertices += result[1]
+    astar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    answers = []
+    ch_vertices = 0
+    for a, b in pairs:
+        answers.append(hierarchy.query(a, b))
+        ch_vertices += hierarchy.vertices_explored
+    ch_time = time.perf_counter() - start
+
+    wrong = 0
+    for result, answer in zip(expected, answers):
+        if (result is None) != (answer is None):
+            wrong += 1
+        elif result is not None and not math.isclose(result[3], answer[1], rel_tol=1e-9):
+            wrong += 1
+    print(f"A*: {astar_time / len(pairs) * 1000:.3f} ms per query, "
+          f"{astar_vertices / len(pairs):.0f} vertices explored")
+    print(f"CH: {ch_time / len(pairs) * 1000:.3f} ms per query, "
+          f"{ch_vertices / len(pairs):.0f} vertices explored")
+    print(f"Speedup {astar_time / ch_time:.1f}x, {wrong} of {len(pairs)} answers differ")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
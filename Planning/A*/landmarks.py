@@ -0,0 +1,260 @@
+"""
+ALT (A*, landmarks, triangle inequality) lower bounds for Graph.astar.
+
+The haversine bound assumes every road can be driven at 130 km/h, which
+is far too optimistic on residential streets. Instead, a few landmarks are
+spread over the graph and the travel times from each of them to every
+vertex, and from every vertex to each of them, are computed once with
+Dijkstra. For any landmark L, by the triangle inequality,
+
+    d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+
+and the largest of these bounds is a consistent A* heuristic. Each query
+uses only the ACTIVE landmarks with the best bound between its start and
+goal, which keeps the heuristic cheap to evaluate.
+
+The travel times are saved next to the graph (FILE.landmarks, or
+graph.landmarks in an edge-list directory) until the graph changes.
+
+Usage: python3 landmarks.py --graph FILE [--count N] [--queries N]
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import sys
+import time
+from array import array
+
+import roads
+
+MAGIC = b"ROUTELM\0"
+VERSION = 2
+LANDMARKS_SUFFIX = ".landmarks"
+DIRECTORY_LANDMARKS = "graph.landmarks"
+DEFAULT_COUNT = 16
+
+# landmarks used by each query
+ACTIVE = 4
+
+
+class Landmarks():
+    def __init__(self, graph, landmarks, forward, backward):
+        self.graph = graph
+        # vertex numbers of the landmarks
+        self.landmarks = landmarks
+        # per landmark, the travel times from it to every vertex
+        self.forward = forward
+        # per landmark, the travel times from every vertex to it
+        self.backward = backward
+
+    def bound(self, v, goal, rows=None):
+        """
+        Returns the best lower bound on the travel time from vertex v to
+        vertex goal given by the landmarks numbered in rows (all of them by
+        default).
+        """
+        best = 0.0
+        for i in range(len(self.landmarks)) if rows is None else rows:
+            forward, backward = self.forward[i], self.backward[i]
+            # comparisons with nan (both ends unreachable) are false
+            d = forward[goal] - forward[v]
+            if d > best:
+                best = d
+            d = backward[v] - backward[goal]
+            if d > best:
+                best = d
+        return best
+
+    def potential(self, goal, source=None, reverse=False):
+        """
+        Returns a function giving the lower bound from a vertex to goal, or
+        from goal to a vertex if reverse is True. With a source, only the
+        ACTIVE landmarks with the best bound between source and goal are
+        used.
+        """
+        rows = range(len(self.landmarks))
+        if source is not None and len(self.landmarks) > ACTIVE:
+            ends = (goal, source) if reverse else (source, goal)
+            rows = sorted(rows, key=lambda i: -self.bound(*ends, (i,)))[:ACTIVE]
+        # d(goal, v) is bounded like d(v, goal) with the two directions swapped
+        tables = (self.backward, self.forward) if reverse else (self.forward, self.backward)
+        terms = [(tables[0][i], tables[0][i][goal], tables[1][i], tables[1][i][goal])
+                 for i in rows]
+
+        def h(v):
+            best = 0.0
+            for forward, forward_goal, backward, backward_goal in terms:
+                d = forward_goal - forward[v]
+                if d > best:
+                    best = d
+                d = backward[v] - backward_goal
+                if d > best:
+                    best = d
+            return best
+        return h
+
+
+def dijkstra(offsets, targets, weights, source):
+    """
+    Returns the travel times from source to every vertex over the given
+    edge arrays, math.inf for vertices it can't reach.
+    """
+    dist = array("d", [math.inf]) * (len(offsets) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for e in range(offsets[v], offsets[v + 1]):
+            w = targets[e]
+            nd = d + weights[e]
+            if nd < dist[w]:
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+
+def build(graph, count=DEFAULT_COUNT):
+    """
+    Picks `count` landmarks by farthest selection: each new landmark is the
+    reachable vertex farthest from all landmarks picked so far, the first
+    the one farthest from vertex 0.
+    """
+    graph_edges = (graph.offsets, graph.targets, graph.weights)
+    reversed_edges = graph.reverse()
+    n = len(graph.ids)
+    landmarks, forward, backward = [], [], []
+    # travel time from the nearest landmark, or from vertex 0 for the first
+    nearest = dijkstra(*graph_edges, 0) if n else array("d")
+    while len(landmarks) < min(count, n):
+        v = max(range(n), key=lambda v: -1.0 if nearest[v] == math.inf else nearest[v])
+        if landmarks and nearest[v] <= 0:
+            # every vertex is already a landmark or unreachable from them
+            v = next((v for v in range(n) if v not in landmarks), None)
+            if v is None:
+                break
+        landmarks.append(v)
+        forward.append(dijkstra(*graph_edges, v))
+        backward.append(dijkstra(*reversed_edges, v))
+        distances = forward[-1]
+        if len(landmarks) == 1:
+            nearest = array("d", distances)
+        else:
+            for w in range(n):
+                if distances[w] < nearest[w]:
+                    nearest[w] = distances[w]
+    return Landmarks(graph, landmarks, forward, backward)
+
+
+def landmarks_path(path):
+    """
+    Where the landmarks of the graph at `path` are saved.
+    """
+    if os.path.isdir(path):
+        return os.path.join(path, DIRECTORY_LANDMARKS)
+    return path + LANDMARKS_SUFFIX
+
+
+def save(index, path, stamps, count=DEFAULT_COUNT):
+    """
+    Writes the landmarks to `path` with roads.write_sections: the forward
+    and backward travel times of each landmark as raw doubles. `count` is
+    the number of landmarks asked for, which build may not have reached.
+    """
+    header = {
+        "sources": stamps,
+        "vertices": len(index.graph.ids),
+        "count": count,
+        "landmarks": index.landmarks
+    }
+    arrays = []
+    for forward, backward in zip(index.forward, index.backward):
+        arrays.append(forward)
+        arrays.append(backward)
+    roads.write_sections(path, MAGIC, VERSION, header, arrays)
+
+
+def load(graph, path, stamps, count=DEFAULT_COUNT):
+    """
+    Returns the landmarks saved at `path`, or None if there are none, they
+    are from another version, another graph or were built for a different
+    count.
+    """
+    def layout(header):
+        if (header["sources"] != stamps or header["vertices"] != len(graph.ids)
+                or header["count"] != count):
+            return None
+        return [("d", len(graph.ids))] * (2 * len(header["landmarks"]))
+
+    stored = roads.read_sections(path, MAGIC, VERSION, layout)
+    if stored is None:
+        return None
+    header, rows = stored
+    return Landmarks(graph, header["landmarks"], rows[0::2], rows[1::2])
+
+
+def load_or_build(graph, path, count=DEFAULT_COUNT):
+    """
+    Returns the landmarks of the graph loaded from the GraphML file or
+    edge-list directory at `path`, building and saving them first if they
+    are missing or stale.
+    """
+    stamps = roads.source_stamps(path)
+    where = landmarks_path(path)
+    index = load(graph, where, stamps, count)
+    if index is None:
+        index = build(graph, count)
+        try:
+            save(index, where, stamps, count)
+        except OSError:
+            pass
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare A* with the landmark and haversine bounds.")
+    parser.add_argument("--graph", required=True,
+                        help="GraphML file or directory with nodes.csv and edges.csv")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT,
+                        help=f"number of landmarks (default: {DEFAULT_COUNT})")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="random queries to compare (default: 200)")
+    args = parser.parse_args()
+
+    graph = roads.load(args.graph)
+    start = time.perf_counter()
+    index = load_or_build(graph, args.graph, args.count)
+    print(f"{len(index.landmarks)} landmarks ready in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(0)
+    pairs = [(rng.choice(graph.ids), rng.choice(graph.ids)) for _ in range(args.queries)]
+    results = {}
+    for name, landmarks in (("haversine", None), ("landmarks", index)):
+        start = time.perf_counter()
+        answers = [graph.astar(a, b, landmarks) for a, b in pairs]
+        elapsed = time.perf_counter() - start
+        found = [answer for answer in answers if answer is not None]
+        vertices = sum(answer[1] for answer in found)
+        edges = sum(answer[2] for answer in found)
+        results[name] = answers
+        print(f"{name}: {elapsed / len(pairs) * 1000:.3f} ms per query, "
+              f"{vertices / max(len(found), 1):.0f} vertices and "
+              f"{edges / max(len(found), 1):.0f} edges explored")
+
+    wrong = 0
+    for expected, answer in zip(results["haversine"], results["landmarks"]):
+        if (expected is None) != (answer is None):
+            wrong += 1
+        elif expected is not None and not math.isclose(expected[3], answer[3], rel_tol=1e-9):
+            wrong += 1
+    print(f"{wrong} of {len(pairs)} costs differ")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Offline road graph loading for routing.Graph.
+
+Reads a road network saved as GraphML (ox.save_graphml, or A*Time.py
+--save) or as an edge list: a directory holding nodes.csv (osmid, y, x) and
+edges.csv (u, v, length and optionally key, maxspeed, highway), the columns
+of ox.graph_to_gdfs. No network access or osmnx is needed.
+
+The first load computes the travel time of every edge and writes the
+resulting arrays to a binary cache next to the source (FILE.cache, or
+graph.cache in the directory). Later loads read only the cache, until the
+source files change size or modification time.
+"""
+
+import ast
+import csv
+import json
+import os
+import struct
+from array import array
+
+import networkx as nx
+
+from routing import Graph
+
+MAGIC = b"ROUTES\0\0"
+VERSION = 1
+CACHE_SUFFIX = ".cache"
+DIRECTORY_CACHE = "graph.cache"
+
+# arrays stored in the cache, in order, with their typecodes
+SECTIONS = (("offsets", "q"), ("targets", "i"), ("weights", "d"), ("lat", "d"), ("lon", "d"))
+
+_HEADER = struct.Struct("<II")
+
+
+def load(path, use_cache=True):
+    """
+    Returns a routing.Graph for the GraphML file or edge-list directory at
+    `path`, from its cache when that is up to date. Graphs read from the
+    cache have no networkx graph, so astar_original can't run on them.
+    """
+    stamps = source_stamps(path)
+    cache = cache_path(path)
+    if use_cache:
+        graph = read_cache(cache, stamps)
+        if graph is not None:
+            return graph
+
+    graph = Graph(read_edge_list(path) if os.path.isdir(path) else read_graphml(path))
+    if use_cache:
+        try:
+            write_cache(graph, cache, stamps)
+        except OSError:
+            # a read-only directory only costs the next load some time
+            pass
+    return graph
+
+
+def read_graphml(path):
+    """
+    Returns the MultiDiGraph in a GraphML file, with the attribute types
+    Graph expects.
+    """
+    G = nx.read_graphml(path, force_multigraph=True)
+    return rebuild(
+        ((v, data) for v, data in G.nodes(data=True)),
+        ((u, v, data) for u, v, data in G.edges(data=True)))
+
+
+def read_edge_list(directory):
+    """
+    Returns the MultiDiGraph stored in directory/nodes.csv and
+    directory/edges.csv. Edges between the same two vertices are kept in
+    order of their key column, if there is one.
+    """
+    with open(os.path.join(directory, "nodes.csv"), encoding="utf-8", newline="") as f:
+        nodes = [(row["osmid"], row) for row in csv.DictReader(f)]
+    with open(os.path.join(directory, "edges.csv"), encoding="utf-8", newline="") as f:
+        edges = [(row["u"], row["v"], row) for row in csv.DictReader(f)]
+    if edges and "key" in edges[0][2]:
+        edges.sort(key=lambda edge: int(edge[2]["key"] or 0))
+    return rebuild(nodes, edges)
+
+
+def rebuild(nodes, edges):
+    """
+    Returns a MultiDiGraph of (id, attributes) nodes and (u, v, attributes)
+    edges read as strings: numeric ids become ints, coordinates and lengths
+    floats, and list-valued tags such as "['50', '70']" lists. Parallel
+    edges get keys 0, 1, ... in the order given.
+    """
+    G = nx.MultiDiGraph()
+    for v, data in nodes:
+        G.add_node(node_id(v), y=float(data["y"]), x=float(data["x"]))
+    for u, v, data in edges:
+        attributes = {"length": float(data["length"])}
+        for tag in ("maxspeed", "highway"):
+            value = data.get(tag)
+            if isinstance(value, str) and value.startswith("["):
+                value = ast.literal_eval(value)
+            if value:
+                attributes[tag] = value
+        G.add_edge(node_id(u), node_id(v), **attributes)
+    return G
+
+
+def node_id(value):
+    """
+    OSM ids are integers, but GraphML and CSV files store them as text.
+    """
+    if isinstance(value, str) and value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def cache_path(path):
+    if os.path.isdir(path):
+        return os.path.join(path, DIRECTORY_CACHE)
+    return path + CACHE_SUFFIX
+
+
+def source_stamps(path):
+    """
+    Returns [[name, size, mtime_ns], ...] of the files the graph is read from.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, "nodes.csv"), os.path.join(path, "edges.csv")]
+    else:
+        files = [path]
+    stamps = []
+    for name in files:
+        st = os.stat(name)
+        stamps.append([os.path.basename(name), st.st_size, st.st_mtime_ns])
+    return stamps
+
+
+def write_cache(graph, path, stamps):
+    """
+    Writes the graph's arrays to `path` with write_sections. Vertex ids are
+    stored as one more int64 array if they are all integers, otherwise in
+    the header.
+    """
+    int_ids = all(isinstance(v, int) for v in graph.ids)
+    header = {
+        "sources": stamps,
+        "vertices": len(graph.ids),
+        "edges": len(graph.targets),
+        "ids": None if int_ids else graph.ids
+    }
+    arrays = [getattr(graph, name) for name, _ in SECTIONS]
+    if int_ids:
+        arrays.append(array("q", graph.ids))
+    write_sections(path, MAGIC, VERSION, header, arrays)
+
+
+def read_cache(path, stamps):
+    """
+    Returns the Graph stored at `path`, or None if there is no cache, it is
+    from another version or it was built from different source files.
+    """
+    def layout(header):
+        if header["sources"] != stamps:
+            return None
+        n, m = header["vertices"], header["edges"]
+        counts = {"offsets": n + 1, "targets": m, "weights": m, "lat": n, "lon": n}
+        arrays = [(typecode, counts[name]) for name, typecode in SECTIONS]
+        if header["ids"] is None:
+            arrays.append(("q", n))
+        return arrays
+
+    stored = read_sections(path, MAGIC, VERSION, layout)
+    if stored is None:
+        return None
+    header, arrays = stored
+    ids = header["ids"] if header["ids"] is not None else arrays[-1].tolist()
+    graph = Graph()
+    graph.attach(ids, *arrays[:len(SECTIONS)])
+    return graph
+
+
+def write_sections(path, magic, version, header, arrays):
+    """
+    Writes `magic`, the version and length of the header, `header` as JSON,
+    then every array in `arrays` as raw machine values. The file is written
+    under a temporary name first, so `path` is never left half written.
+    """
+    encoded = json.dumps(header).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(magic)
+            f.write(_HEADER.pack(version, len(encoded)))
+            f.write(encoded)
+            for values in arrays:
+                values.tofile(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_sections(path, magic, version, layout):
+    """
+    Reads a file written by write_sections. `layout(header)` returns the
+    (typecode, count) of every array that follows the header, or None if
+    the header doesn't match what the caller expects. Returns (header,
+    arrays), or None if the file is missing, of another format or version,
+    rejected by `layout` or not exactly the size the layout says.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(magic):
+        return None
+    try:
+        stored_version, length = _HEADER.unpack_from(data, len(magic))
+        if stored_version != version:
+            return None
+        at = len(magic) + _HEADER.size
+        header = json.loads(data[at:at + length])
+        at += length
+        sections = layout(header)
+        if sections is None:
+            return None
+        arrays = []
+        for typecode, count in sections:
+            values = array(typecode)
+            size = count * values.itemsize
+            values.frombytes(data[at:at + size])
+            at += size
+            arrays.append(values)
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+    if at != len(data):
+        return None
+    return header, arrays
@@ -0,0 +1,368 @@
+"""
+Fastest-route search on a road graph.
+
+Graph wraps an OSMnx / networkx MultiDiGraph whose nodes have 'x' and 'y'
+coordinates and whose edges have a 'length' in meters and optionally
+'maxspeed' and 'highway' tags. The travel time of every edge is computed
+once and stored in compact arrays, which is all astar needs, so a Graph
+can also be restored from those arrays alone (see roads.py).
+"""
+
+import heapq
+import math
+from array import array
+from haversine import haversine, Unit
+
+# Mean earth radius in meters, as used by haversine
+EARTH_RADIUS = 6371008.8
+
+class PriorityQueue:
+    def __init__(self):
+        self.elements = []
+    
+    def empty(self):
+        return not self.elements
+    
+    def put(self, item, priority):
+        heapq.heappush(self.elements, (priority, item))
+    
+    def get(self):
+        return heapq.heappop(self.elements)[1]
+
+class Graph():
+    def __init__(self, graph=None):
+        # The networkx graph, None when restored from arrays with attach
+        self.graph = graph
+        # Default speeds in km/h in case the maxspeed property is missing
+        self.defaults = {
+            "motorway": 130,
+            "trunk": 110,
+            "primary": 90,
+            "secondary": 80,
+            "tertiary": 70,
+            "unclassified": 50,
+            "residential": 50,
+            "motorway_link": 60,
+            "trunk_link": 50,
+            "primary_link": 40,
+            "secondary_link": 40,
+            "tertiary_link": 40,
+            "living_street": 20,
+            "service": 20,
+            "pedestrian": 20,
+            "track": 20,
+            "road": 50
+        }
+        # The fastest speed on any road, for the heuristic
+        self.max_speed = self.to_ms(130)
+        if graph is not None:
+            self.prepare()
+
+    def prepare(self):
+        # Parse the speed of every edge once and store the travel times in
+        # arrays indexed by vertex number: the edges of vertex i are
+        # targets[offsets[i]:offsets[i + 1]], and weights holds the seconds
+        # it takes to drive each of them
+        ids = list(self.graph.nodes)
+        index = {v: i for i, v in enumerate(ids)}
+        offsets = array("q", [0])
+        targets = array("i")
+        weights = array("d")
+        for v in ids:
+            for neighbor in self.graph.neighbors(v):
+                targets.append(index[neighbor])
+                weights.append(self.travel_time(self.graph[v][neighbor][0]))
+            offsets.append(len(targets))
+
+        # Coordinates in radians for the heuristic
+        nodes = self.graph.nodes
+        lat = array("d", (math.radians(nodes[v]['y']) for v in ids))
+        lon = array("d", (math.radians(nodes[v]['x']) for v in ids))
+        self.attach(ids, offsets, targets, weights, lat, lon)
+
+    def attach(self, ids, offsets, targets, weights, lat, lon):
+        # Use precomputed arrays, as built by prepare
+        self.ids = ids
+        self.index = {v: i for i, v in enumerate(ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.lat = lat
+        self.lon = lon
+        self.cos_lat = array("d", (math.cos(a) for a in lat))
+        self.reversed = None
+
+    def reverse(self):
+        # The edges of the graph turned around, in the same array layout, so
+        # searches can run backward from a goal. Built on first use
+        if self.reversed is None:
+            n = len(self.ids)
+            offsets = array("q", [0]) * (n + 1)
+            for v in self.targets:
+                offsets[v + 1] += 1
+            for v in range(n):
+                offsets[v + 1] += offsets[v]
+            fill = offsets[:-1]
+            targets = array("i", [0]) * len(self.targets)
+            weights = array("d", [0.0]) * len(self.targets)
+            for v in range(n):
+                for e in range(self.offsets[v], self.offsets[v + 1]):
+                    w = self.targets[e]
+                    targets[fill[w]] = v
+                    weights[fill[w]] = self.weights[e]
+                    fill[w] += 1
+            self.reversed = (offsets, targets, weights)
+        return self.reversed
+
+    def nearest(self, y, x):
+        # The vertex closest to a latitude and longitude in degrees
+        lat, lon = math.radians(y), math.radians(x)
+        cos_lat = math.cos(lat)
+        best, best_d = None, math.inf
+        for i in range(len(self.ids)):
+            a = math.sin((self.lat[i] - lat) / 2)
+            b = math.sin((self.lon[i] - lon) / 2)
+            d = a * a + self.cos_lat[i] * cos_lat * b * b
+            if d < best_d:
+                best, best_d = i, d
+        return None if best is None else self.ids[best]
+
+    def travel_time(self, edge):
+        # Seconds to drive along an edge
+        try:
+            speed = self.to_ms(self.get_speed(edge))
+        except ValueError:
+            # maxspeed values like "50;70" or "signals", or an unknown road type
+            speed = 0
+        if speed <= 0:
+            speed = self.to_ms(50)
+        return edge["length"] / speed
+
+    def heuristic(self, current, to_find):
+        current_to_end = haversine((current['y'], current['x']),(to_find['y'], to_find['x']),unit=Unit.METERS)
+        # make sure it is an underestimate
+        # time at max speed
+        return (current_to_end / self.to_ms(130))
+    
+    def get_speed(self, node):
+        # Get the speed of the road of which a vertex is part of
+        
+        # Check if the maxspeed property exists
+        if node.get("maxspeed"):
+            road_speed = ""
+            # if the road has more than 1 max speed, pick the first
+            if isinstance(node["maxspeed"], list):
+                road_speed = node["maxspeed"][0]
+            else:
+                road_speed = node["maxspeed"]
+            return road_speed
+        # check if the road type is specified
+        elif node.get("highway"):
+            road_type = ""
+            # if the road has more than 1 road type, pick the first
+            if isinstance(node["highway"], list):
+                road_type = node["highway"][0]
+            else:
+                road_type = node["highway"]
+            road_speed = self.defaults.get(road_type)
+            return str(road_speed)
+        # Otherwise return a default speed
+        else:
+            return str(50)
+    
+    def is_mph(self, speed):
+        # Check if the speed is in mph (if part of the string says mph)
+        try:
+            int(speed)
+            return False
+        except:
+            return True
+    
+    def to_ms(self, speed):
+        # Convert the speed to m/s
+        if self.is_mph(speed):
+            converted = int(speed[:-4]) / 2.237
+        else:
+            converted = int(speed) / 3.6
+        # Return the speed rounded to 2 decimal places
+        return round(converted, 2)
+
+    def astar(self, start, to_find, landmarks=None, bidirectional=False):
+        # A* over the precomputed travel times, with the haversine bound
+        # inlined on the coordinate arrays, or the tighter landmark bound
+        # when given a landmarks.Landmarks for this graph
+        if bidirectional:
+            return self.bidirectional_astar(start, to_find, landmarks)
+        source = self.index[start]
+        goal = self.index[to_find]
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        lat, lon, cos_lat = self.lat, self.lon, self.cos_lat
+        goal_lat, goal_lon, goal_cos = lat[goal], lon[goal], cos_lat[goal]
+        # seconds at the fastest speed per radian of haversine angle
+        scale = 2 * EARTH_RADIUS / self.max_speed
+        potential = None if landmarks is None else landmarks.potential(goal, source)
+
+        to_visit = [(0, 0.0, source)]
+        from_v = {source: -1}
+        cost_to_vertex = {source: 0.0}
+        vertices_explored = 0
+        edges_explored = 0
+
+        while to_visit:
+            _, cost, current = heapq.heappop(to_visit)
+            # skip entries left behind by a cheaper path found later
+            if cost > cost_to_vertex[current]:
+                continue
+            vertices_explored += 1
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(self.ids[current])
+                    current = from_v[current]
+                path.reverse()
+                return path, vertices_explored, edges_explored, cost
+
+            for e in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[e]
+                new_cost = cost + weights[e]
+                edges_explored += 1
+                if neighbor not in cost_to_vertex or new_cost < cost_to_vertex[neighbor]:
+                    cost_to_vertex[neighbor] = new_cost
+                    from_v[neighbor] = current
+                    if potential is None:
+                        a = math.sin((lat[neighbor] - goal_lat) / 2)
+                        b = math.sin((lon[neighbor] - goal_lon) / 2)
+                        h = scale * math.asin(math.sqrt(a * a + cos_lat[neighbor] * goal_cos * b * b))
+                    else:
+                        h = potential(neighbor)
+                    heapq.heappush(to_visit, (new_cost + h, new_cost, neighbor))
+        return
+
+    def haversine_bound(self, target):
+        # Function giving the haversine lower bound on the travel time between
+        # a vertex and vertex number target, in either direction
+        lat, lon, cos_lat = self.lat, self.lon, self.cos_lat
+        target_lat, target_lon, target_cos = lat[target], lon[target], cos_lat[target]
+        scale = 2 * EARTH_RADIUS / self.max_speed
+
+        def h(v):
+            a = math.sin((lat[v] - target_lat) / 2)
+            b = math.sin((lon[v] - target_lon) / 2)
+            return scale * math.asin(math.sqrt(a * a + cos_lat[v] * target_cos * b * b))
+        return h
+
+    def bidirectional_astar(self, start, to_find, landmarks=None):
+        # A* forward from start and backward from to_find over the reversed
+        # edges, returning the same tuple as astar. Both searches share the
+        # average potential p(v) = (h_goal(v) - h_start(v)) / 2, forward keys
+        # being cost + p(v) and backward keys cost - p(v): p is consistent
+        # for both directions, so each side settles vertices in order of
+        # reduced cost, and no path is shorter than the best one found once
+        # the two smallest keys add up to its cost
+        source = self.index[start]
+        goal = self.index[to_find]
+        if landmarks is None:
+            to_goal = self.haversine_bound(goal)
+            from_start = self.haversine_bound(source)
+        else:
+            to_goal = landmarks.potential(goal, source)
+            from_start = landmarks.potential(source, goal, reverse=True)
+        potentials = {}
+
+        def potential(v):
+            p = potentials.get(v)
+            if p is None:
+                p = potentials[v] = (to_goal(v) - from_start(v)) / 2
+            return p
+
+        edges = ((self.offsets, self.targets, self.weights), self.reverse())
+        # per direction: queue of (key, cost, vertex), costs and parents
+        queues = ([(potential(source), 0.0, source)], [(-potential(goal), 0.0, goal)])
+        costs = ({source: 0.0}, {goal: 0.0})
+        parents = ({source: -1}, {goal: -1})
+        signs = (1, -1)
+        best = 0.0 if source == goal else math.inf
+        meet = source if source == goal else -1
+        vertices_explored = 0
+        edges_explored = 0
+
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+            side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+            _, cost, current = heapq.heappop(queues[side])
+            # skip entries left behind by a cheaper path found later
+            if cost > costs[side][current]:
+                continue
+            vertices_explored += 1
+
+            offsets, targets, weights = edges[side]
+            cost_to_vertex, other, from_v = costs[side], costs[1 - side], parents[side]
+            sign = signs[side]
+            for e in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[e]
+                new_cost = cost + weights[e]
+                edges_explored += 1
+                if neighbor not in cost_to_vertex or new_cost < cost_to_vertex[neighbor]:
+                    p = potential(neighbor)
+                    # landmarks can prove a vertex is on no path from start to goal
+                    if not math.isfinite(p):
+                        continue
+                    cost_to_vertex[neighbor] = new_cost
+                    from_v[neighbor] = current
+                    heapq.heappush(queues[side], (new_cost + sign * p, new_cost, neighbor))
+                    if neighbor in other and new_cost + other[neighbor] < best:
+                        best = new_cost + other[neighbor]
+                        meet = neighbor
+
+        if meet == -1:
+            return
+        path = []
+        current = meet
+        while current != -1:
+            path.append(self.ids[current])
+            current = parents[0][current]
+        path.reverse()
+        current = parents[1][meet]
+        while current != -1:
+            path.append(self.ids[current])
+            current = parents[1][current]
+        return path, vertices_explored, edges_explored, best
+
+    def astar_original(self, start, to_find):
+        # The original A* on the networkx graph, parsing the speed of every
+        # edge it relaxes. Kept to benchmark astar against, so it needs a
+        # Graph built from a networkx graph
+        to_visit = PriorityQueue()
+        to_visit.put(start, 0)
+        from_v = {}
+        cost_to_vertex= {}
+        from_v[start] = None 
+        cost_to_vertex[start] = 0
+        vertices_explored = 0
+        edges_explored = 0
+
+        while not to_visit.empty():
+            current = to_visit.get()
+            vertices_explored += 1
+            if current == to_find:
+                path = []
+                while current != start:
+                    path.append(current)
+                    current = from_v[current]
+                path.append(start)
+                path.reverse()
+                return path, vertices_explored, edges_explored, cost_to_vertex[to_find]
+            
+            for neighbor in list(self.graph.neighbors(current)):
+                # The weight of the nodes is the time to get there (distance/speed)
+                speed = self.to_ms(self.get_speed(self.graph[current][neighbor][0]))
+                distance = self.graph[current][neighbor][0]["length"]
+                new_cost = cost_to_vertex[current] + distance/speed
+                edges_explored += 1
+                if neighbor not in cost_to_vertex or new_cost < cost_to_vertex[neighbor]:
+                    cost_to_vertex[neighbor] = new_cost
+                    priority = new_cost + self.heuristic(self.graph.nodes[neighbor], self.graph.nodes[to_find])
+                    to_visit.put(neighbor, priority)
+                    from_v[neighbor] = current
+        return
@@ -0,0 +1,142 @@
+"""
+Batch degrees-of-separation queries.
+
+Reads (source, target) pairs of IMDb person ids, one pair per line separated
+by whitespace or a comma, from a file or stdin. Pairs are grouped by source so
+a single BFS tree answers every target of that source, and the groups are
+spread over a process pool. Results are written to stdout as JSON lines.
+
+Usage: python3 batch.py [-d DIRECTORY] [-w WORKERS] [-v] [PAIRS]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from graph import StarGraph
+from search import bfs_tree, bidirectional_search, path_in_tree
+
+# Loaded once in the parent before the pool starts, so forked workers share
+# it copy-on-write. Workers started with "spawn" map the snapshot themselves.
+graph = StarGraph()
+loaded_directory = None
+
+
+def load(directory):
+    global loaded_directory
+    if loaded_directory != directory:
+        graph.load(directory)
+        loaded_directory = directory
+
+
+def read_pairs(lines):
+    """
+    Yields (source, target) tuples, skipping blank lines and comments.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.replace(",", " ").split()
+        if len(fields) != 2:
+            print(f"Skipping line {number}: expected two person ids", file=sys.stderr)
+            continue
+        yield fields[0], fields[1]
+
+
+def group_by_source(pairs):
+    """
+    Returns a list of (source, [targets]) in order of first appearance.
+    """
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, []).append(target)
+    return list(groups.items())
+
+
+def answer(group):
+    """
+    Answers every target of one source. Returns a list of result dicts.
+    """
+    source_id, target_ids = group
+    source = graph.person_index(source_id)
+    targets = [graph.person_index(t) for t in target_ids]
+
+    if source is None:
+        return [result(source_id, t, None, "unknown source") for t in target_ids]
+
+    known = [t for t in targets if t is not None and t != source]
+    parents = None
+    if len(set(known)) > 1:
+        parents = bfs_tree(graph, source, known)
+
+    results = []
+    for target_id, target in zip(target_ids, targets):
+        if target is None:
+            results.append(result(source_id, target_id, None, "unknown target"))
+            continue
+        if parents is None or target == source:
+            path = bidirectional_search(graph, source, target)
+        else:
+            path = path_in_tree(parents, target)
+        results.append(result(source_id, target_id, path))
+    return results
+
+
+def result(source_id, target_id, path, error=None):
+    res = {"source": source_id, "target": target_id}
+    if error is not None:
+        res["error"] = error
+    elif path is None:
+        res["degrees"] = None
+        res["path"] = None
+    else:
+        res["degrees"] = len(path)
+        res["path"] = [[graph.movie_ids[m], graph.person_ids[p]] for m, p in path]
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch degrees-of-separation queries.")
+    parser.add_argument("pairs", nargs="?", help="file of source/target pairs, stdin if omitted")
+    parser.add_argument("-d", "--directory", default="large", help="data folder (default: large)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: number of cores)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log frontier counters for every search to stderr")
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(process)d %(name)s: %(message)s")
+
+    load(args.directory)
+
+    if args.pairs is None:
+        groups = group_by_source(read_pairs(sys.stdin))
+    else:
+        with open(args.pairs, encoding="utf-8") as f:
+            groups = group_by_source(read_pairs(f))
+
+    if args.workers <= 1 or len(groups) <= 1:
+        for results in map(answer, groups):
+            write(results)
+        return
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with context.Pool(args.workers, initializer=load, initargs=(args.directory,)) as pool:
+        for results in pool.imap_unordered(answer, groups):
+            write(results)
+
+
+def write(results):
+    for res in results:
+        sys.stdout.write(json.dumps(res) + "\n")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares the original one-directional search with the bidirectional BFS
+on random pairs of people.
+
+Usage: python3 benchmark.py [directory] [pairs]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from graph import StarGraph
+from search import bidirectional_search, forward_search
+
+
+def time_search(search, graph, pairs):
+    """
+    Returns the path lengths and per-query times in milliseconds.
+    """
+    lengths = []
+    times = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = search(graph, source, target)
+        times.append((time.perf_counter() - start) * 1000)
+        lengths.append(None if path is None else len(path))
+    return lengths, times
+
+
+def report(name, times):
+    print(f"{name:>14}: mean {statistics.mean(times):9.2f} ms, "
+          f"median {statistics.median(times):9.2f} ms, max {max(times):9.2f} ms")
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python3 benchmark.py [directory] [pairs]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    graph = StarGraph()
+    graph.load(directory)
+
+    # only pick people who starred in something
+    candidates = [p for p in range(graph.num_people())
+                  if graph.person_offsets[p + 1] > graph.person_offsets[p]]
+    if not candidates:
+        sys.exit("No people with movies in this dataset.")
+    rng = random.Random(0)
+    pairs = [(rng.choice(candidates), rng.choice(candidates)) for _ in range(count)]
+
+    forward_lengths, forward_times = time_search(forward_search, graph, pairs)
+    bidirectional_lengths, bidirectional_times = time_search(bidirectional_search, graph, pairs)
+
+    if forward_lengths != bidirectional_lengths:
+        sys.exit("Searches disagree on path lengths.")
+
+    print(f"{count} pairs, {graph.num_people()} people, {graph.num_movies()} movies")
+    report("forward", forward_times)
+    report("bidirectional", bidirectional_times)
+    speedup = sum(forward_times) / max(sum(bidirectional_times), 1e-9)
+    print(f"Speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
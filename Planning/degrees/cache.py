@@ -0,0 +1,86 @@
+"""
+Memory-bounded LRU cache for neighbors_for_person results.
+"""
+
+import sys
+from collections import OrderedDict
+
+# default budget for cached neighbor sets, in bytes
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class NeighborCache():
+    """
+    LRU cache of person_id -> set of (movie_id, person_id) pairs, evicting
+    the least recently used entries once the estimated size of everything
+    cached exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (value, estimated size in bytes), least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        size = pairs_size(value)
+        if size > self.max_bytes:
+            # never worth flushing the whole cache for one entry
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def invalidate(self):
+        """
+        Drop every entry, e.g. after the data has been reloaded.
+        """
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def pairs_size(pairs):
+    """
+    Estimated memory held by a collection of (str, str) tuples, counting
+    strings shared between tuples once.
+    """
+    size = sys.getsizeof(pairs)
+    seen = set()
+    for pair in pairs:
+        size += sys.getsizeof(pair)
+        for value in pair:
+            if id(value) not in seen:
+                seen.add(id(value))
+                size += sys.getsizeof(value)
+    return size
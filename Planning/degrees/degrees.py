@@ -1,55 +1,52 @@
-import csv
+import math
 import sys
 
-from util import Frontier
+import landmarks as landmark_index
+from cache import NeighborCache
+from graph import StarGraph, NamesView, PeopleView, MoviesView
+from namesearch import NameIndex
+from search import bidirectional_search
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Compact graph holding every person, movie and star relation
+graph = StarGraph()
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Read-only views in the original dict shapes, backed by `graph`:
+# names maps lowercase names to a set of corresponding person_ids,
+# people maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids),
+# movies maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+names = NamesView(graph)
+people = PeopleView(graph)
+movies = MoviesView(graph)
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Prefix and typo-tolerant name search over `graph`
+name_index = NameIndex(graph)
 
+# Optional LandmarkIndex over `graph`, see load_landmarks
+landmarks = None
 
-def load_data(directory):
+# Recently used neighbors_for_person results, emptied whenever data is loaded
+neighbor_cache = NeighborCache()
+
+
+def load_data(directory, verbose=False):
     """
     Load data from CSV files into memory.
+    With verbose, parsing progress is reported on stderr.
+    """
+    global landmarks
+    graph.load(directory, verbose)
+    landmarks = None
+    neighbor_cache.invalidate()
+
+
+def load_landmarks(directory, count=landmark_index.DEFAULT_COUNT):
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    Load (building it first if needed) the landmark index for the data
+    loaded from `directory`. Enables degree_bounds and lets shortest_path
+    prune its search.
+    """
+    global landmarks
+    landmarks = landmark_index.load_or_build(directory, graph, count)
 
 
 def main():
@@ -59,7 +56,7 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, verbose=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -78,9 +75,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index(path[i][1])]
+            person2 = graph.person_names[graph.person_index(path[i + 1][1])]
+            movie = graph.movie_titles[graph.movie_index(path[i + 1][0])]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -91,49 +88,36 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None:
+        return None
 
-    to_visit = Frontier()
-    from_vertex = {}
-    mutual_star = {}
-    cost_to_vertex = {}
-
-    for m in people[source]["movies"]:
-        to_visit.add(m)
-        from_vertex[m] = None
-        mutual_star[m] = None
-        cost_to_vertex[m] = 0
-
-    while not to_visit.empty():
-        current = to_visit.remove()
-
-        if target in movies[current]["stars"]:
-            path = []
-            path.append(current)
-            current = from_vertex[current]
-            while current != None:
-                path.append(current)
-                current = from_vertex[current]
-            path.reverse()
-            
-            if len(path) == 1:
-                return [(path[0], target)]
-            
-            res = []
-            for i in range(len(path) - 1):
-                res.append((path[i], mutual_star[path[i+1]]))
-            res.append((path[len(path) - 1], target))
-            return res
-
-        for s in movies[current]["stars"]:
-            for m in people[s]["movies"]:
-                new_cost = cost_to_vertex[current] + 1
-                if m not in cost_to_vertex or new_cost < cost_to_vertex[m]:
-                    cost_to_vertex[m] = new_cost
-                    to_visit.add(m)
-                    mutual_star[m] = s
-                    from_vertex[m] = current
-                
-    return None
+    path = bidirectional_search(graph, source, target, landmarks)
+    if path is None:
+        return None
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+def degree_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between two
+    person ids from the landmark index, without searching. Both bounds are
+    math.inf if the people are known not to be connected, and upper is
+    math.inf if the landmarks cannot tell.
+
+    Like shortest_path, a person is one degree from themselves through any
+    of their movies, and not connected to themselves without one.
+    """
+    if landmarks is None:
+        raise RuntimeError("landmark index not loaded, call load_landmarks first")
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None:
+        return math.inf, math.inf
+    if source == target:
+        return (1, 1) if len(graph.movies_of(source)) else (math.inf, math.inf)
+    return landmarks.bounds(source, target)
 
 
 def person_id_for_name(name):
@@ -141,15 +125,15 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [graph.person_ids[p] for p in graph.people_named(name)]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            p = graph.person_index(person_id)
+            name = graph.person_names[p]
+            birth = graph.person_births[p]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -162,16 +146,43 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_names(query, limit=10):
+    """
+    Returns up to `limit` candidate people for a partial or misspelled name,
+    best first, as dicts of: id, name, birth, edits (0 for exact and prefix
+    matches). Never prompts, so it can back autocomplete endpoints.
+    """
+    candidates = []
+    for p, edits in name_index.search(query, limit):
+        candidates.append({
+            "id": graph.person_ids[p],
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "edits": edits
+        })
+    return candidates
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
-    who starred with a given person.
+    who starred with a given person, as a frozenset shared with the
+    cache (copy it with set() to modify it).
     """
-    movie_ids = people[person_id]["movies"]
+    cached = neighbor_cache.get(person_id)
+    if cached is not None:
+        return cached
+
+    p = graph.person_index(person_id)
+    if p is None:
+        raise KeyError(person_id)
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for m in graph.movies_of(p):
+        movie_id = graph.movie_ids[m]
+        for s in graph.stars_of(m):
+            neighbors.add((movie_id, graph.person_ids[s]))
+    neighbors = frozenset(neighbors)
+    neighbor_cache.put(person_id, neighbors)
     return neighbors
 
 
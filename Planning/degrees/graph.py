@@ -0,0 +1,294 @@
+"""
+Compact in-memory representation of the people/movies/stars graph.
+
+Person and movie IMDb ids are interned to dense integers (their row order in
+people.csv and movies.csv) and the bipartite star graph is stored in CSR form:
+the movies of person `p` are
+`person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the stars of
+movie `m` are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+Every part of the graph is a flat array (strings are a utf-8 blob plus
+offsets, lookups are permutations sorted by key), so a loaded graph can be
+mapped straight from a snapshot file, see snapshot.py.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+
+import ingest
+import snapshot
+from namesearch import build_gram_index
+from util import find
+
+# string tables stored as a "<name>" blob and a "<name>_offsets" section
+STRING_SECTIONS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+    "name_keys", "gram_keys"
+)
+
+
+class StringTable(Sequence):
+    """
+    Read-only list of strings packed into one utf-8 blob.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class StarGraph():
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        empty = ([snapshot.strings([])] * 3, array("i"))
+        self.attach(build_sections(empty, empty, array("i"), array("i")))
+
+    def load(self, directory, verbose=False):
+        """
+        Load people.csv, movies.csv and stars.csv from `directory`,
+        replacing whatever was loaded before. With verbose, parsing
+        progress is reported on stderr.
+
+        The parsed graph is cached in a snapshot next to the CSVs; later
+        loads map that snapshot instead, until one of the CSVs changes.
+        """
+        sections = snapshot.load(directory)
+        if sections is None:
+            sections = build_sections(*ingest.read_csvs(directory, verbose))
+            sections = snapshot.save(directory, sections)
+        self.attach(sections)
+
+    def attach(self, sections):
+        """
+        Use the arrays in `sections` (as produced by build_sections, or read
+        back from a snapshot) as the graph.
+        """
+        self.sections = sections
+        for name in STRING_SECTIONS:
+            setattr(self, name, StringTable(sections[name], sections[f"{name}_offsets"]))
+
+        # permutations of person/movie indices sorted by IMDb id
+        self.person_id_order = sections["person_id_order"]
+        self.movie_id_order = sections["movie_id_order"]
+
+        # name_keys holds every lowercase name in sorted order,
+        # name_order the person index each one belongs to
+        self.name_order = sections["name_order"]
+
+        # trigram index over name_keys, see namesearch.py
+        self.gram_offsets = sections["gram_offsets"]
+        self.gram_postings = sections["gram_postings"]
+
+        # CSR adjacency in both directions
+        self.person_offsets = sections["person_offsets"]
+        self.person_movies = sections["person_movies"]
+        self.movie_offsets = sections["movie_offsets"]
+        self.movie_stars = sections["movie_stars"]
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of an IMDb person id, or None.
+        """
+        return find(self.person_id_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of an IMDb movie id, or None.
+        """
+        return find(self.movie_id_order, self.movie_ids, movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the indices of every person with the given name,
+        compared case-insensitively.
+        """
+        key = name.lower()
+        lo = bisect_left(self.name_keys, key)
+        hi = bisect_right(self.name_keys, key, lo)
+        return sorted(self.name_order[lo:hi])
+
+    def unique_names(self):
+        """
+        Yields every distinct lowercase name once, in sorted order.
+        """
+        previous = None
+        for key in self.name_keys:
+            if key != previous:
+                yield key
+                previous = key
+
+    def movies_of(self, p):
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+
+def build_sections(people, movies, edge_people, edge_movies):
+    """
+    Build every graph section from the packed (id, name, birth) and
+    (id, title, year) tables of people and movies, each with its id order,
+    and parallel arrays of (person, movie) index pairs, as read by
+    ingest.read_csvs. Duplicate pairs are kept only once.
+    """
+    sections = {}
+    (person_columns, sections["person_id_order"]) = people
+    (movie_columns, sections["movie_id_order"]) = movies
+    for name, table in zip(("person_ids", "person_names", "person_births"), person_columns):
+        sections[name], sections[f"{name}_offsets"] = table
+    for name, table in zip(("movie_ids", "movie_titles", "movie_years"), movie_columns):
+        sections[name], sections[f"{name}_offsets"] = table
+    columns = {}
+
+    names = StringTable(sections["person_names"], sections["person_names_offsets"])
+    keys = [name.lower() for name in names]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    sections["name_order"] = array("i", order)
+    columns["name_keys"] = [keys[p] for p in order]
+    del keys, order
+
+    columns["gram_keys"], sections["gram_offsets"], sections["gram_postings"] = \
+        build_gram_index(columns["name_keys"])
+
+    for name in ("name_keys", "gram_keys"):
+        sections[name], sections[f"{name}_offsets"] = snapshot.strings(columns[name])
+
+    num_people = len(sections["person_id_order"])
+    num_movies = len(sections["movie_id_order"])
+    offsets, grouped = _csr(edge_people, edge_movies, num_people)
+    person_offsets, person_movies = _dedupe(offsets, grouped)
+    people_col = array("i")
+    for p in range(num_people):
+        people_col.extend([p] * (person_offsets[p + 1] - person_offsets[p]))
+    movie_offsets, movie_stars = _csr(person_movies, people_col, num_movies)
+
+    sections["person_offsets"] = person_offsets
+    sections["person_movies"] = person_movies
+    sections["movie_offsets"] = movie_offsets
+    sections["movie_stars"] = movie_stars
+    return sections
+
+
+def _csr(sources, targets, size):
+    """
+    Counting sort of (source, target) pairs into an offsets array of
+    length size + 1 and a targets array grouped by source.
+    """
+    offsets = array("i", bytes(4 * (size + 1)))
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("i", offsets[:-1])
+    grouped = array("i", bytes(4 * len(targets)))
+    for s, t in zip(sources, targets):
+        grouped[cursor[s]] = t
+        cursor[s] += 1
+    return offsets, grouped
+
+
+def _dedupe(offsets, grouped):
+    """
+    Sort every CSR row and drop repeated entries.
+    """
+    new_offsets = array("i", [0])
+    new_grouped = array("i")
+    for i in range(len(offsets) - 1):
+        new_grouped.extend(sorted(set(grouped[offsets[i]:offsets[i + 1]])))
+        new_offsets.append(len(new_grouped))
+    return new_offsets, new_grouped
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` mapping in the original dict-of-dicts shape:
+    person_id -> {"name", "birth", "movies": set of movie_ids}.
+    Entries are built on access, so only the rows actually used cost memory.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        g = self.graph
+        p = g.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": g.person_names[p],
+            "birth": g.person_births[p],
+            "movies": {g.movie_ids[m] for m in g.movies_of(p)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people()
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` mapping in the original dict-of-dicts shape:
+    movie_id -> {"title", "year", "stars": set of person_ids}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        g = self.graph
+        m = g.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": g.movie_titles[m],
+            "year": g.movie_years[m],
+            "stars": {g.person_ids[p] for p in g.stars_of(m)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies()
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` mapping: lowercase name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        found = self.graph.people_named(name)
+        if not found:
+            raise KeyError(name)
+        return {self.graph.person_ids[p] for p in found}
+
+    def __iter__(self):
+        return self.graph.unique_names()
+
+    def __len__(self):
+        return sum(1 for _ in self.graph.unique_names())
@@ -0,0 +1,226 @@
+"""
+Streaming CSV ingest for the degrees data.
+
+Each file is read with csv.reader in chunks of `chunk_rows` rows, and every
+chunk is packed straight into compact arrays (utf-8 string tables for
+people and movies, index pairs for stars) before the next one is read, so
+only one chunk of parsed rows is held at a time. When the files are large,
+people.csv and movies.csv are parsed concurrently in two worker processes,
+which send back only their packed tables; stars.csv is then streamed in the
+parent and its ids are resolved through one id -> row dict per file, built
+from the packed ids once they are complete. Progress (rows per second and
+skipped rows, by reason) is reported on stderr as it goes.
+"""
+
+import csv
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+CHUNK_ROWS = 50000
+
+# below this many bytes of people.csv + movies.csv, worker processes cost
+# more than they save
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+# seconds between progress lines for one file
+REPORT_INTERVAL = 1.0
+
+
+class Progress():
+    def __init__(self, name, verbose, stream=None):
+        self.name = name
+        self.verbose = verbose
+        self.stream = stream if stream is not None else sys.stderr
+        self.rows = 0
+        self.skipped = {}
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def update(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report >= REPORT_INTERVAL:
+            self.last_report = now
+            self.report()
+
+    def report(self, final=False):
+        if not self.verbose:
+            return
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        skipped = ", ".join(f"{count} {reason}" for reason, count in sorted(self.skipped.items()))
+        print(f"{self.name}: {self.rows} rows{' done' if final else ''} "
+              f"({self.rows / elapsed:,.0f} rows/s), skipped: {skipped or 'none'}",
+              file=self.stream, flush=True)
+
+
+def chunks(path, columns, progress, chunk_rows=CHUNK_ROWS):
+    """
+    Yields lists of tuples holding the given columns of each row of the CSV
+    at `path`, at most `chunk_rows` rows at a time. Rows with too few fields
+    or an empty first column are skipped.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            positions = [header.index(column) for column in columns]
+        except ValueError:
+            raise ValueError(f"{path} must have columns: {', '.join(columns)}") from None
+        width = max(positions) + 1
+        first = positions[0]
+
+        while True:
+            block = list(islice(reader, chunk_rows))
+            if not block:
+                break
+            progress.update(len(block))
+            rows = []
+            for row in block:
+                if len(row) < width:
+                    progress.skip("short rows")
+                elif not row[first]:
+                    progress.skip("empty ids")
+                else:
+                    rows.append(tuple(row[i] for i in positions))
+            del block
+            yield rows
+
+
+def read_entities(path, columns, verbose=False, chunk_rows=CHUNK_ROWS):
+    """
+    Read (id, attribute, attribute) rows from people.csv or movies.csv,
+    first occurrence of each id only.
+
+    Returns (tables, id_order): one (utf-8 blob, offsets) string table per
+    column, as snapshot.strings packs them, and the permutation of row
+    indices sorted by id. Each chunk is packed into the tables as soon as it
+    is parsed; sorting the ids is the only step that briefly holds one
+    Python string per row.
+    """
+    progress = Progress(os.path.basename(path), verbose)
+    tables = [(bytearray(), array("q", [0])) for _ in columns]
+    for chunk in chunks(path, columns, progress, chunk_rows):
+        for row in chunk:
+            for (blob, offsets), value in zip(tables, row):
+                blob += value.encode("utf-8")
+                offsets.append(len(blob))
+        del chunk
+
+    ids = _RawKeys(*tables[0])
+    # stable, so a repeated id follows its first occurrence
+    order = array("i", sorted(range(len(ids)), key=ids.__getitem__))
+    repeated = bytearray(len(ids))
+    for previous, i in zip(order, order[1:]):
+        if ids[i] == ids[previous]:
+            repeated[i] = 1
+            progress.skip("repeated ids")
+    if any(repeated):
+        tables, order = _drop_rows(tables, order, repeated)
+    progress.report(final=True)
+    return [(array("B", blob), offsets) for blob, offsets in tables], order
+
+
+def read_csvs(directory, verbose=False, chunk_rows=CHUNK_ROWS):
+    """
+    Returns (people, movies, edge_people, edge_movies) as expected by
+    graph.build_sections. Star ids are resolved with a dict from each
+    person and movie id to its row, built once the ids are packed and
+    dropped after stars.csv is read.
+    """
+    people_path = os.path.join(directory, "people.csv")
+    movies_path = os.path.join(directory, "movies.csv")
+    people_columns = ("id", "name", "birth")
+    movies_columns = ("id", "title", "year")
+
+    size = os.path.getsize(people_path) + os.path.getsize(movies_path)
+    if size >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(2) as pool:
+            people = pool.submit(read_entities, people_path, people_columns, verbose, chunk_rows)
+            movies = pool.submit(read_entities, movies_path, movies_columns, verbose, chunk_rows)
+            people = people.result()
+            movies = movies.result()
+    else:
+        people = read_entities(people_path, people_columns, verbose, chunk_rows)
+        movies = read_entities(movies_path, movies_columns, verbose, chunk_rows)
+
+    person_rows = _rows_by_id(*people[0][0])
+    movie_rows = _rows_by_id(*movies[0][0])
+
+    progress = Progress("stars.csv", verbose)
+    edge_people = array("i")
+    edge_movies = array("i")
+    stars_path = os.path.join(directory, "stars.csv")
+    for chunk in chunks(stars_path, ("person_id", "movie_id"), progress, chunk_rows):
+        for person_id, movie_id in chunk:
+            p = person_rows.get(person_id)
+            m = movie_rows.get(movie_id)
+            if p is None:
+                progress.skip("unknown people")
+            elif m is None:
+                progress.skip("unknown movies")
+            else:
+                edge_people.append(p)
+                edge_movies.append(m)
+    progress.report(final=True)
+
+    return people, movies, edge_people, edge_movies
+
+
+def _rows_by_id(blob, offsets):
+    """
+    Returns a dict from every id in a (utf-8 blob, offsets) table to its
+    row.
+    """
+    blob = blob.tobytes()
+    return {blob[offsets[i]:offsets[i + 1]].decode("utf-8"): i for i in range(len(offsets) - 1)}
+
+
+class _RawKeys():
+    """
+    The strings of a (blob, offsets) table as utf-8 bytes slices of the
+    blob, which sort in the same order as the decoded strings but are
+    cheaper to compare.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def _drop_rows(tables, order, dropped):
+    """
+    Returns the tables without the rows flagged in `dropped`, and `order`
+    renumbered to match.
+    """
+    kept = []
+    for blob, offsets in tables:
+        new_blob = bytearray()
+        new_offsets = array("q", [0])
+        for i in range(len(offsets) - 1):
+            if not dropped[i]:
+                new_blob += blob[offsets[i]:offsets[i + 1]]
+                new_offsets.append(len(new_blob))
+        kept.append((new_blob, new_offsets))
+
+    # new index of every row: old index minus the rows dropped before it
+    renumber = array("i", bytes(4 * len(dropped)))
+    removed = 0
+    for i, flag in enumerate(dropped):
+        removed += flag
+        renumber[i] = i - removed
+    return kept, array("i", (renumber[i] for i in order if not dropped[i]))
@@ -0,0 +1,189 @@
+"""
+Landmark index for instant degree-distance estimates.
+
+A few dozen high-degree people are picked as landmarks and the BFS distance
+(in degrees) from each of them to every person is stored as one byte per
+person. By the triangle inequality, for any landmark L,
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the tightest of those over all landmarks bounds the distance of any pair
+without searching. The index is written to degrees.landmarks next to the CSVs.
+
+Usage: python3 landmarks.py [directory] [count]
+"""
+
+import math
+import os
+import sys
+from array import array
+
+import snapshot
+from graph import StarGraph
+from util import Node, QueueFrontier
+
+MAGIC = b"DEGLAND\0"
+VERSION = 2
+FILENAME = "degrees.landmarks"
+DEFAULT_COUNT = 32
+
+# stored distance for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    def __init__(self, landmarks, distances):
+        # person indices of the landmarks
+        self.landmarks = landmarks
+        # one row of num_people bytes per landmark
+        self.distances = distances
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees between two person
+        indices. Both are math.inf if the landmarks prove the two people
+        are not connected; upper is math.inf if no landmark reaches both.
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = math.inf
+        for row in self.distances:
+            ds = row[source]
+            dt = row[target]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                # one of them is in this landmark's component, the other is not
+                return math.inf, math.inf
+            lower = max(lower, abs(ds - dt))
+            upper = min(upper, ds + dt)
+        return lower, upper
+
+    def lower_bound(self, source, target):
+        return self.bounds(source, target)[0]
+
+
+def choose_landmarks(graph, count):
+    """
+    Returns the `count` people with the most co-star slots
+    (sum of the cast sizes of their movies, minus themselves).
+    """
+    degree = []
+    for p in range(graph.num_people()):
+        total = 0
+        for m in graph.movies_of(p):
+            total += graph.movie_offsets[m + 1] - graph.movie_offsets[m] - 1
+        degree.append(total)
+    order = sorted(range(len(degree)), key=lambda p: (-degree[p], p))
+    return [p for p in order[:count] if degree[p] > 0]
+
+
+def distances_from(graph, source):
+    """
+    BFS distances in degrees from `source` to every person, as a byte array.
+    Distances too large to store are clamped below UNREACHABLE.
+    """
+    distances = array("B", bytes([UNREACHABLE])) * graph.num_people()
+    distances[source] = 0
+    seen_movies = bytearray(graph.num_movies())
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    frontier = QueueFrontier()
+    frontier.add(Node(source, None, None))
+    while not frontier.empty():
+        person = frontier.remove().state
+        d = min(distances[person] + 1, UNREACHABLE - 1)
+        for m in graph.movies_of(person):
+            if seen_movies[m]:
+                continue
+            seen_movies[m] = 1
+            for s in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                if distances[s] == UNREACHABLE:
+                    distances[s] = d
+                    frontier.add(Node(s, None, None))
+    return distances
+
+
+def build(graph, count=DEFAULT_COUNT):
+    landmarks = choose_landmarks(graph, count)
+    return LandmarkIndex(landmarks, [distances_from(graph, p) for p in landmarks])
+
+
+def path_for(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def save(directory, index, graph, count=DEFAULT_COUNT):
+    """
+    Write the landmark index in the snapshot format, one byte section per
+    landmark, with the landmarks and the count asked for in the header.
+    """
+    sections = {f"distances_{i}": array("B", row) for i, row in enumerate(index.distances)}
+    data = snapshot.encode(sections, snapshot.source_stamps(directory), MAGIC, VERSION, {
+        "people": graph.num_people(),
+        "count": count,
+        "landmarks": list(index.landmarks)
+    })
+    snapshot.write(path_for(directory), data)
+
+
+def load(directory, graph, count=DEFAULT_COUNT):
+    """
+    Map the landmark index in `directory`. Returns None if it is missing,
+    corrupt, was built from different CSVs or with a different landmark
+    count.
+    """
+    try:
+        stamps = snapshot.source_stamps(directory)
+    except OSError:
+        return None
+    buffer = snapshot.map_file(path_for(directory))
+    if buffer is None:
+        return None
+    decoded = snapshot.decode_with_header(buffer, stamps, MAGIC, VERSION)
+    if decoded is None:
+        return None
+    header, sections = decoded
+    landmarks = header.get("landmarks")
+    if (header.get("people") != graph.num_people() or header.get("count") != count
+            or not isinstance(landmarks, list)):
+        return None
+
+    distances = [sections.get(f"distances_{i}") for i in range(len(landmarks))]
+    if any(row is None or len(row) != graph.num_people() for row in distances):
+        return None
+    return LandmarkIndex(landmarks, distances)
+
+
+def load_or_build(directory, graph, count=DEFAULT_COUNT):
+    """
+    Load the landmark index for `directory`, building and saving it first
+    if it is missing or stale.
+    """
+    index = load(directory, graph, count)
+    if index is None:
+        index = build(graph, count)
+        try:
+            save(directory, index, graph, count)
+        except OSError:
+            pass
+    return index
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python3 landmarks.py [directory] [count]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COUNT
+
+    graph = StarGraph()
+    graph.load(directory)
+    index = build(graph, count)
+    save(directory, index, graph, count)
+    print(f"Saved {len(index.landmarks)} landmarks to {path_for(directory)}")
+
+
+if __name__ == "__main__":
+    main()
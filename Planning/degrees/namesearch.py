@@ -0,0 +1,243 @@
+"""
+Prefix and typo-tolerant person name search.
+
+Prefix search is a binary search over the sorted lowercase names the graph
+already keeps (name_keys). Fuzzy search uses a trigram index built at load
+time and stored in the snapshot: every distinct name is padded with spaces
+and split into overlapping 3-character grams, and each gram maps to the
+sorted list of name ranks containing it. A name within k edits of the query
+shares all but at most 3k of the query's grams, so candidates only need to
+be drawn from the postings of its 3k + 1 rarest grams before checking the
+edit distance.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# query length from which two typos are tolerated instead of one
+TWO_TYPOS_FROM = 8
+
+# the postings of a common gram are counted in full, rather than searched
+# for each remaining candidate, while at most this many times longer than
+# the list of candidates
+SCAN_RATIO = 8
+
+# postings entries counted to find the candidates: a query with no gram
+# rare enough to fit only gets the candidates sharing its rarest grams
+POSTINGS_BUDGET = 5000
+
+# candidates checked with the exact edit distance, best gram overlap first
+MAX_VERIFIED = 1000
+
+
+def grams(text, whole=True):
+    """
+    Returns the set of padded trigrams of `text`. With whole=False the end
+    of the text is not padded, so the grams also occur in longer names
+    that start with it.
+    """
+    padded = f"  {text} " if whole else f"  {text}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_gram_index(name_keys):
+    """
+    Build the trigram index over a sorted list of lowercase names.
+    Returns (sorted gram strings, offsets array, postings array), where the
+    postings of gram i are postings[offsets[i]:offsets[i + 1]], each the
+    rank in name_keys of the first occurrence of a matching name.
+    """
+    index = {}
+    previous = None
+    for rank, key in enumerate(name_keys):
+        if key == previous:
+            continue
+        previous = key
+        for gram in grams(key):
+            postings = index.get(gram)
+            if postings is None:
+                index[gram] = postings = array("i")
+            postings.append(rank)
+
+    keys = sorted(index)
+    offsets = array("q", [0])
+    postings = array("i")
+    for gram in keys:
+        postings.extend(index[gram])
+        offsets.append(len(postings))
+    return keys, offsets, postings
+
+
+class NameIndex():
+    def __init__(self, graph):
+        self.graph = graph
+
+    def prefix(self, query, limit=10):
+        """
+        Returns up to `limit` person indices whose name starts with `query`,
+        in alphabetical order of name.
+        """
+        keys = self.graph.name_keys
+        query = query.lower()
+        lo = bisect_left(keys, query)
+        found = []
+        for rank in range(lo, len(keys)):
+            if len(found) >= limit or not keys[rank].startswith(query):
+                break
+            found.append(self.graph.name_order[rank])
+        return found
+
+    def fuzzy(self, query, limit=10, max_typos=None, whole=True):
+        """
+        Returns up to `limit` (person index, edits) pairs for names within
+        `max_typos` edits of `query` (by default 1, or 2 for long queries),
+        closest first. With whole=False, names are matched if they start
+        with something within `max_typos` edits of the query.
+        """
+        query = query.lower()
+        if max_typos is None:
+            max_typos = 2 if len(query) >= TWO_TYPOS_FROM else 1
+
+        keys = self.graph.name_keys
+        scored = []
+        # names verified so far at each distance
+        within = [0] * (max_typos + 1)
+        for fewest, rank in self._candidates(query, max_typos, whole):
+            if sum(within[:fewest + 1]) >= limit:
+                # no candidate left can be closer than the names found
+                break
+            key = keys[rank]
+            edits = bounded_edit_distance(query, key, max_typos, whole)
+            if edits is not None:
+                scored.append((edits, key, rank))
+                within[edits] += 1
+        scored.sort()
+
+        found = []
+        for edits, key, rank in scored:
+            # every person sharing this name sits next to it in name_keys
+            while rank < len(keys) and keys[rank] == key:
+                found.append((self.graph.name_order[rank], edits))
+                rank += 1
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def search(self, query, limit=10):
+        """
+        Ranked autocomplete candidates: exact matches, then prefix matches,
+        then names within a typo or two of the query, then names starting
+        with something within a typo or two of it. Returns up to `limit`
+        unique (person index, edits) pairs, with 0 edits for exact and
+        prefix hits.
+        """
+        if not query.strip():
+            return []
+        found = {}
+        for p in self.graph.people_named(query):
+            found[p] = 0
+        if len(found) < limit:
+            for p in self.prefix(query, limit):
+                found.setdefault(p, 0)
+        if len(found) < limit:
+            for p, edits in self.fuzzy(query, limit):
+                found.setdefault(p, edits)
+        if len(found) < limit:
+            for p, edits in self.fuzzy(query, limit, whole=False):
+                found.setdefault(p, edits)
+        return list(found.items())[:limit]
+
+    def _candidates(self, query, max_typos, whole):
+        """
+        Returns (fewest edits, rank) pairs for the names that may be within
+        `max_typos` edits of the query, fewest first.
+
+        Each edit changes at most 3 of the query's grams, so a match shares
+        all but 3 * max_typos of them, and at least one of the 3 * max_typos
+        + 1 rarest. The postings of those are counted to find the candidates,
+        as far as POSTINGS_BUDGET allows; the postings of the other grams,
+        rarest first, are then counted too or, when much longer than the
+        list of candidates left, searched for each of them, and candidates
+        are dropped as soon as they have missed too many grams.
+        """
+        g = self.graph
+        bounds = []
+        for gram in grams(query, whole):
+            i = bisect_left(g.gram_keys, gram)
+            if i < len(g.gram_keys) and g.gram_keys[i] == gram:
+                bounds.append((g.gram_offsets[i], g.gram_offsets[i + 1]))
+            else:
+                bounds.append((0, 0))
+        bounds.sort(key=lambda b: b[1] - b[0])
+
+        slack = 3 * max_typos
+        if len(bounds) <= slack:
+            # too short for the gram filter to guarantee anything
+            return []
+
+        postings = g.gram_postings
+        counts = Counter()
+        counted = 0
+        used = 0
+        for lo, hi in bounds[:slack + 1]:
+            if used and used + hi - lo > POSTINGS_BUDGET:
+                break
+            counts.update(postings[lo:hi])
+            counted += 1
+            used += hi - lo
+        ranked = list(counts)
+
+        for counted, (lo, hi) in enumerate(bounds[counted:], counted + 1):
+            if not ranked:
+                break
+            if hi - lo <= SCAN_RATIO * len(ranked):
+                counts.update(postings[lo:hi])
+            else:
+                for rank in ranked:
+                    i = bisect_left(postings, rank, lo, hi)
+                    if i < hi and postings[i] == rank:
+                        counts[rank] += 1
+            least = counted - slack
+            if least > 1:
+                ranked = [rank for rank in ranked if counts[rank] >= least]
+
+        # most shared grams first
+        ranked.sort(key=lambda rank: -counts[rank])
+        return [((len(bounds) - counts[rank] + 2) // 3, rank) for rank in ranked[:MAX_VERIFIED]]
+
+
+def bounded_edit_distance(a, b, bound, whole=True):
+    """
+    Levenshtein distance between `a` and `b` (or, with whole=False, between
+    `a` and the closest prefix of `b`) if it is at most `bound`, otherwise
+    None. Only the diagonal band of width 2 * bound + 1 is computed.
+    """
+    if not whole:
+        b = b[:len(a) + bound]
+    elif abs(len(a) - len(b)) > bound:
+        return None
+
+    n = len(b)
+    over = bound + 1
+    previous = [j if j <= bound else over for j in range(n + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (n + 1)
+        if i <= bound:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - bound), min(n, i + bound) + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > bound:
+            return None
+        previous = current
+
+    edits = previous[-1] if whole else min(previous)
+    return edits if edits <= bound else None
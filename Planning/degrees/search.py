@@ -0,0 +1,238 @@
+"""
+Shortest path searches over a StarGraph.
+
+All searches work on dense person/movie indices and return the path as a
+list of (movie, person) index pairs, or None if the people are not connected.
+Frontier counters for every search are logged at DEBUG level.
+"""
+
+import logging
+import math
+
+from util import Node, QueueFrontier
+
+logger = logging.getLogger(__name__)
+
+
+def bidirectional_search(graph, source, target, landmarks=None):
+    """
+    Level-synchronous BFS from both ends, always expanding whichever
+    frontier is smaller, that stops at the first person reached from both.
+
+    With a LandmarkIndex, pairs the landmarks prove disconnected return
+    immediately, and people whose depth plus landmark lower bound to the
+    other end exceeds the landmark upper bound are never expanded.
+    """
+    if source == target:
+        # same shape as forward_search: one hop through any of their movies
+        movies = graph.movies_of(source)
+        return [(movies[0], target)] if len(movies) else None
+
+    # person -> Node whose parent is one step closer to that side's root,
+    # with the shared movie as the action
+    forward_reached = {source: Node(source, None, None)}
+    backward_reached = {target: Node(target, None, None)}
+    forward = QueueFrontier()
+    forward.add(forward_reached[source])
+    backward = QueueFrontier()
+    backward.add(backward_reached[target])
+    forward_movies = set()
+    backward_movies = set()
+
+    upper = math.inf
+    if landmarks is not None:
+        lower, upper = landmarks.bounds(source, target)
+        if lower == math.inf:
+            return None
+    forward_depth = 0
+    backward_depth = 0
+
+    meet = None
+    while meet is None and not forward.empty() and not backward.empty():
+        if len(forward) <= len(backward):
+            forward_depth += 1
+            prune = _pruner(landmarks, target, forward_depth, upper)
+            meet = _expand_level(graph, forward, forward_reached, forward_movies, backward_reached, prune)
+        else:
+            backward_depth += 1
+            prune = _pruner(landmarks, source, backward_depth, upper)
+            meet = _expand_level(graph, backward, backward_reached, backward_movies, forward_reached, prune)
+
+    _log_stats("bidirectional", (source, target), forward, backward)
+    if meet is None:
+        return None
+    return _join(forward_reached[meet], backward_reached[meet])
+
+
+def _pruner(landmarks, goal, depth, upper):
+    """
+    Returns a function telling whether a person reached at `depth` cannot
+    be on a path to `goal` of at most `upper` degrees, or None if there is
+    nothing to prune with.
+    """
+    if landmarks is None or upper == math.inf:
+        return None
+    goal_distances = [row[goal] for row in landmarks.distances]
+    rows = list(zip(landmarks.distances, goal_distances))
+    slack = upper - depth
+
+    def prune(person):
+        for row, d in rows:
+            if abs(row[person] - d) > slack:
+                return True
+        return False
+
+    return prune
+
+
+def _expand_level(graph, frontier, reached, seen_movies, other_reached, prune=None):
+    """
+    Expand every person currently in `frontier` by one hop. Returns the first
+    person that the other side has already reached, or None. People rejected
+    by `prune` are skipped without being marked as reached.
+    """
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+    for _ in range(len(frontier)):
+        node = frontier.remove()
+        for m in graph.movies_of(node.state):
+            if m in seen_movies:
+                continue
+            seen_movies.add(m)
+            for s in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                if s in reached:
+                    continue
+                if prune is not None and prune(s):
+                    continue
+                child = Node(s, node, m)
+                reached[s] = child
+                if s in other_reached:
+                    return s
+                frontier.add(child)
+    return None
+
+
+def _join(forward_node, backward_node):
+    path = []
+    node = forward_node
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+
+    node = backward_node
+    while node.parent is not None:
+        path.append((node.action, node.parent.state))
+        node = node.parent
+    return path
+
+
+def _log_stats(search, query, *frontiers):
+    if logger.isEnabledFor(logging.DEBUG):
+        for frontier in frontiers:
+            logger.debug("%s search %s: %s", search, query, frontier.stats())
+
+
+def bfs_tree(graph, source, targets=None):
+    """
+    BFS from `source` that returns a dict of person -> (movie, parent person)
+    for every person reached, with the source mapped to None. If `targets` is
+    given, the search stops as soon as all of them have been reached.
+    """
+    parents = {source: None}
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        remaining.discard(source)
+        if not remaining:
+            return parents
+
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+    seen_movies = set()
+    frontier = QueueFrontier()
+    frontier.add(Node(source, None, None))
+    while not frontier.empty():
+        person = frontier.remove().state
+        for m in graph.movies_of(person):
+            if m in seen_movies:
+                continue
+            seen_movies.add(m)
+            for s in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                if s in parents:
+                    continue
+                parents[s] = (m, person)
+                frontier.add(Node(s, None, None))
+                if remaining is not None:
+                    remaining.discard(s)
+                    if not remaining:
+                        _log_stats("tree", source, frontier)
+                        return parents
+    _log_stats("tree", source, frontier)
+    return parents
+
+
+def path_in_tree(parents, target):
+    """
+    Returns the (movie, person) path from the root of a bfs_tree to `target`,
+    or None if the target was not reached.
+    """
+    if target not in parents:
+        return None
+    path = []
+    person = target
+    while parents[person] is not None:
+        movie, previous = parents[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+    return path
+
+
+def forward_search(graph, source, target):
+    """
+    One-directional BFS over movies starting from the source's movies.
+    This is the original algorithm, kept as a baseline for benchmark.py.
+    """
+    to_visit = QueueFrontier()
+    from_vertex = {}
+    mutual_star = {}
+    cost_to_vertex = {}
+
+    for m in graph.movies_of(source):
+        to_visit.add(Node(m, None, None))
+        from_vertex[m] = None
+        mutual_star[m] = None
+        cost_to_vertex[m] = 0
+
+    while not to_visit.empty():
+        current = to_visit.remove().state
+        stars = graph.stars_of(current)
+
+        if target in stars:
+            path = []
+            path.append(current)
+            current = from_vertex[current]
+            while current != None:
+                path.append(current)
+                current = from_vertex[current]
+            path.reverse()
+
+            res = []
+            for i in range(len(path) - 1):
+                res.append((path[i], mutual_star[path[i + 1]]))
+            res.append((path[len(path) - 1], target))
+            _log_stats("forward", (source, target), to_visit)
+            return res
+
+        for s in stars:
+            for m in graph.movies_of(s):
+                new_cost = cost_to_vertex[current] + 1
+                if m not in cost_to_vertex or new_cost < cost_to_vertex[m]:
+                    cost_to_vertex[m] = new_cost
+                    to_visit.add(Node(m, None, None))
+                    mutual_star[m] = s
+                    from_vertex[m] = current
+
+    _log_stats("forward", (source, target), to_visit)
+    return None
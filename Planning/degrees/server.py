@@ -0,0 +1,267 @@
+"""
+Long-running degrees query server.
+
+Loads the data once and answers JSON queries over HTTP with asyncio:
+
+    GET /path?source=ID&target=ID     shortest path between two person ids
+    GET /neighbors?person=ID          (movie_id, person_id) pairs for a person
+    GET /names?q=TEXT&limit=N         ranked name candidates
+    GET /bounds?source=ID&target=ID   landmark distance bounds (--landmarks)
+    GET /metrics                      latency histograms and cache stats
+
+Searches run in a process pool forked after the data is loaded, so a slow
+query only occupies one worker while name lookups and cached neighbors are
+answered straight from the event loop.
+
+Usage: python3 server.py [-d DIRECTORY] [--host HOST] [--port PORT] [-w WORKERS] [--landmarks]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+
+# upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+MAX_REQUEST_LINE = 8192
+
+
+class LatencyHistogram():
+    def __init__(self):
+        # one count per bucket, plus one for slower requests
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile, in milliseconds.
+        """
+        if self.total == 0:
+            return None
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "mean_ms": self.sum_ms / self.total if self.total else None,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {f"le_{bound}": count for bound, count in zip(BUCKETS, self.counts)}
+                       | {"le_inf": self.counts[-1]}
+        }
+
+
+class BadRequest(Exception):
+    pass
+
+
+class UnknownPerson(Exception):
+    pass
+
+
+class Server():
+    def __init__(self, directory, workers, use_landmarks):
+        self.directory = directory
+        self.use_landmarks = use_landmarks
+        self.histograms = {}
+        context = multiprocessing.get_context(
+            "fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        self.pool = ProcessPoolExecutor(workers, mp_context=context,
+                                        initializer=init_worker,
+                                        initargs=(directory, use_landmarks))
+        self.routes = {
+            "/path": self.path,
+            "/neighbors": self.neighbors,
+            "/names": self.names,
+            "/bounds": self.bounds,
+            "/metrics": self.metrics
+        }
+
+    async def handle(self, reader, writer):
+        try:
+            status, body = await self.respond(reader)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            writer.close()
+            return
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii") + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def respond(self, reader):
+        request_line = await reader.readline()
+        if len(request_line) > MAX_REQUEST_LINE:
+            return "414 URI Too Long", {"error": "request line too long"}
+        # skip the headers, no endpoint needs them
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return "400 Bad Request", {"error": "malformed request line"}
+        method, target, _ = parts
+        if method != "GET":
+            return "405 Method Not Allowed", {"error": "only GET is supported"}
+
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return "404 Not Found", {"error": f"unknown endpoint {url.path}"}
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        start = time.perf_counter()
+        try:
+            status, body = "200 OK", await route(params)
+        except BadRequest as e:
+            status, body = "400 Bad Request", {"error": str(e)}
+        except UnknownPerson as e:
+            status, body = "404 Not Found", {"error": f"unknown person {e.args[0]}"}
+        except Exception as e:
+            status, body = "500 Internal Server Error", {"error": repr(e)}
+        self.histograms.setdefault(url.path, LatencyHistogram()).observe(
+            (time.perf_counter() - start) * 1000)
+        return status, body
+
+    async def path(self, params):
+        source = known(required(params, "source"))
+        target = known(required(params, "target"))
+        path = await self.offload(degrees.shortest_path, source, target)
+        return {
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        }
+
+    async def neighbors(self, params):
+        person = known(required(params, "person"))
+        cached = degrees.neighbor_cache.get(person)
+        if cached is None:
+            cached = frozenset(await self.offload(degrees.neighbors_for_person, person))
+            degrees.neighbor_cache.put(person, cached)
+        return {"person": person, "neighbors": sorted(cached)}
+
+    async def names(self, params):
+        query = required(params, "q")
+        try:
+            limit = int(params.get("limit", 10))
+        except ValueError:
+            raise BadRequest("limit must be an integer") from None
+        return {"query": query, "candidates": degrees.search_names(query, max(1, min(limit, 100)))}
+
+    async def bounds(self, params):
+        if degrees.landmarks is None:
+            raise BadRequest("server started without --landmarks")
+        source = known(required(params, "source"))
+        target = known(required(params, "target"))
+        lower, upper = degrees.degree_bounds(source, target)
+        return {
+            "source": source,
+            "target": target,
+            "lower": None if lower == math.inf else lower,
+            "upper": None if upper == math.inf else upper
+        }
+
+    async def metrics(self, params):
+        return {
+            "latency": {path: h.summary() for path, h in sorted(self.histograms.items())},
+            "neighbor_cache": degrees.neighbor_cache.stats()
+        }
+
+    async def offload(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, function, *args)
+
+
+def required(params, name):
+    value = params.get(name)
+    if not value:
+        raise BadRequest(f"missing parameter {name}")
+    return value
+
+
+def known(person_id):
+    if degrees.graph.person_index(person_id) is None:
+        raise UnknownPerson(person_id)
+    return person_id
+
+
+def init_worker(directory, use_landmarks):
+    """
+    Forked workers inherit the loaded graph; others load it themselves.
+    """
+    if degrees.graph.num_people() == 0:
+        degrees.load_data(directory)
+        if use_landmarks:
+            degrees.load_landmarks(directory)
+
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Serving on {addresses}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees of separation query server.")
+    parser.add_argument("-d", "--directory", default="large", help="data folder (default: large)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="search worker processes (default: number of cores)")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="load the landmark index for /bounds and pruned searches")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, verbose=True)
+    if args.landmarks:
+        degrees.load_landmarks(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    server = Server(args.directory, args.workers, args.landmarks)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
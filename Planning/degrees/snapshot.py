@@ -0,0 +1,181 @@
+"""
+Versioned binary snapshot of a loaded StarGraph.
+
+The snapshot is written next to the CSVs it was built from. It starts with a
+magic string and a small JSON header holding the format version, the size and
+mtime of every source CSV, and the offset/length/typecode of each section.
+Every section is a flat array aligned to 8 bytes, so a later run can mmap the
+file and hand memoryviews straight to the graph without parsing anything.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 2
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+_LENGTH = struct.Struct("<I")
+
+
+def path_for(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def source_stamps(directory):
+    """
+    Returns {csv name: [size, mtime_ns]} for every source file.
+    """
+    stamps = {}
+    for name in SOURCES:
+        st = os.stat(os.path.join(directory, name))
+        stamps[name] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def encode(sections, stamps, magic=MAGIC, version=VERSION, extra=None):
+    """
+    Serialize a dict of name -> array into snapshot bytes. Other files in
+    the same format pass their own `magic` and `version`, and any `extra`
+    header fields.
+    """
+    table = {}
+    offset = 0
+    for name, values in sections.items():
+        length = len(values) * values.itemsize
+        table[name] = [offset, length, values.typecode]
+        offset += _aligned(length)
+
+    header = dict(extra or {})
+    header.update({
+        "version": version,
+        "sources": stamps,
+        "sections": table
+    })
+    header = json.dumps(header).encode("utf-8")
+    start = _aligned(len(magic) + _LENGTH.size + len(header))
+
+    out = bytearray(start + offset)
+    out[:len(magic)] = magic
+    _LENGTH.pack_into(out, len(magic), len(header))
+    out[len(magic) + _LENGTH.size:len(magic) + _LENGTH.size + len(header)] = header
+    for name, values in sections.items():
+        at, length, _ = table[name]
+        out[start + at:start + at + length] = values.tobytes()
+    return out
+
+
+def decode(buffer, stamps=None, magic=MAGIC, version=VERSION):
+    """
+    Returns a dict of name -> memoryview over `buffer`, or None if the buffer
+    is not a snapshot of this version or, when `stamps` is given, was built
+    from different source files.
+    """
+    decoded = decode_with_header(buffer, stamps, magic, version)
+    return None if decoded is None else decoded[1]
+
+
+def decode_with_header(buffer, stamps=None, magic=MAGIC, version=VERSION):
+    """
+    Like decode, but returns (header, sections) so callers can read their
+    extra header fields.
+    """
+    view = memoryview(buffer)
+    if bytes(view[:len(magic)]) != magic:
+        return None
+    try:
+        (header_length,) = _LENGTH.unpack_from(view, len(magic))
+        header_start = len(magic) + _LENGTH.size
+        header = json.loads(bytes(view[header_start:header_start + header_length]))
+        if not isinstance(header, dict) or header.get("version") != version:
+            return None
+        if stamps is not None and header.get("sources") != stamps:
+            return None
+
+        start = _aligned(header_start + header_length)
+        sections = {}
+        for name, (at, length, typecode) in header["sections"].items():
+            if start + at + length > len(view):
+                return None
+            sections[name] = view[start + at:start + at + length].cast(typecode)
+    except (struct.error, ValueError, TypeError, AttributeError, KeyError):
+        # truncated or corrupt snapshot, rebuild it
+        return None
+    return header, sections
+
+
+def map_file(path):
+    """
+    Returns a read-only mmap of the file at `path`, or None if it can't be
+    opened.
+    """
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def write(path, data):
+    """
+    Write `data` to `path` through a temporary file, which is removed if
+    the write fails. Raises OSError if `path` can't be written.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load(directory):
+    """
+    Map the snapshot in `directory` if it is present and up to date.
+    Returns the sections, or None if it has to be rebuilt.
+    """
+    try:
+        stamps = source_stamps(directory)
+    except OSError:
+        return None
+    buffer = map_file(path_for(directory))
+    if buffer is None:
+        return None
+    return decode(buffer, stamps)
+
+
+def save(directory, sections):
+    """
+    Write a snapshot of `sections` next to the CSVs and return the sections
+    as read back from it. If the directory is not writable, the snapshot is
+    only kept in memory.
+    """
+    stamps = source_stamps(directory)
+    data = encode(sections, stamps)
+    try:
+        write(path_for(directory), data)
+    except OSError:
+        return decode(data)
+    return load(directory) or decode(data)
+
+
+def _aligned(n):
+    return (n + 7) & ~7
+
+
+def strings(values):
+    """
+    Pack a list of strings into a (utf-8 blob, offsets) pair of arrays.
+    """
+    blob = bytearray()
+    offsets = array("q", [0])
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return array("B", blob), offsets
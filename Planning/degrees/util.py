@@ -1,27 +1,93 @@
+from bisect import bisect_left
+from collections import deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
         self.action = action
 
 
-class Frontier():
+class StackFrontier():
+    """
+    LIFO frontier backed by a deque, with a hashed index of the states it
+    holds so contains_state is O(1). Counts pushes, pops, membership checks
+    and the peak number of nodes held, see stats().
+    """
+
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # state -> number of nodes in the frontier with that state
+        self.states = {}
+        self.pushes = 0
+        self.pops = 0
+        self.peak_size = 0
+        self.membership_checks = 0
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+        self.pushes += 1
+        if len(self.frontier) > self.peak_size:
+            self.peak_size = len(self.frontier)
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        self.membership_checks += 1
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def __len__(self):
+        return len(self.frontier)
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
+        return self._discard(self.frontier.pop())
+
+    def _discard(self, node):
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            self.states[node.state] = count - 1
+        self.pops += 1
+        return node
+
+    def stats(self):
+        return {
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "peak_size": self.peak_size,
+            "membership_checks": self.membership_checks
+        }
+
+
+class QueueFrontier(StackFrontier):
+    """
+    FIFO variant of StackFrontier.
+    """
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        return self._discard(self.frontier.popleft())
+
+
+# The original list-backed Frontier was a FIFO queue
+Frontier = QueueFrontier
+
+
+def find(order, keys, key):
+    """
+    Binary search for `key` in `keys`, visited in the sorted `order`.
+    Returns the index in `keys` of the match, or None.
+    """
+    i = bisect_left(order, key, key=keys.__getitem__)
+    if i < len(order) and keys[order[i]] == key:
+        return order[i]
+    return None
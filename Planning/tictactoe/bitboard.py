@@ -0,0 +1,198 @@
+"""
+Bitboard Tic Tac Toe
+
+A position is a pair (x, o) of 9-bit integers, with bit i * 3 + j set when
+that player owns cell (i, j). Wins, move counts and the empty cells of every
+9-bit pattern are precomputed, so player, actions, result, winner, terminal
+and utility are table lookups and integer operations instead of scans of the
+nested lists used by tictactoe.py.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# rows, columns and diagonals
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
+# indexed by a 9-bit pattern: whether it contains a line, how many cells it
+# holds, and its cells as single-bit masks
+WINS = bytes(any(bits & m == m for m in WIN_MASKS) for bits in range(FULL + 1))
+COUNT = bytes(bin(bits).count("1") for bits in range(FULL + 1))
+CELLS = tuple(tuple(1 << c for c in range(9) if bits >> c & 1) for bits in range(FULL + 1))
+
+# Number of positions expanded by minimax
+nodes_searched = 0
+
+# Position key (x << 9 | o) -> minimax value
+transpositions = {}
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboard of a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, e in enumerate(row):
+            if e == X:
+                x |= 1 << (i * 3 + j)
+            elif e == O:
+                o |= 1 << (i * 3 + j)
+    return (x, o)
+
+
+def to_board(state):
+    """
+    Returns the list-of-lists board of an (x, o) bitboard.
+    """
+    x, o = state
+    return [[X if x >> (i * 3 + j) & 1 else O if o >> (i * 3 + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def initial_state():
+    return (0, 0)
+
+
+def player(state):
+    """
+    Returns player who has the next turn.
+    """
+    x, o = state
+    return X if COUNT[x] == COUNT[o] else O
+
+
+def actions(state):
+    """
+    Returns set of all possible actions (i, j) available.
+    """
+    x, o = state
+    return {divmod(bit.bit_length() - 1, 3) for bit in CELLS[FULL ^ (x | o)]}
+
+
+def result(state, action):
+    """
+    Returns the state that results from making move (i, j).
+    """
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise ValueError(f"invalid action {action}")
+    x, o = state
+    bit = 1 << (i * 3 + j)
+    if (x | o) & bit:
+        raise ValueError(f"invalid action {action}")
+    if COUNT[x] == COUNT[o]:
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(state):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = state
+    if WINS[x]:
+        return X
+    if WINS[o]:
+        return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = state
+    return bool(WINS[x] or WINS[o] or x | o == FULL)
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = state
+    return 1 if WINS[x] else -1 if WINS[o] else 0
+
+
+def minimax(state, table=True):
+    """
+    Returns the optimal action (i, j) for the current player, or None if
+    the game is over. With table set to False every position is searched
+    from scratch, exactly like tictactoe.minimax in PLAIN mode.
+    """
+    global nodes_searched
+    nodes_searched += 1
+
+    x, o = state
+    if terminal(state):
+        return None
+    maximizing = COUNT[x] == COUNT[o]
+    best = None
+    move = None
+    for bit in CELLS[FULL ^ (x | o)]:
+        v = value(x | bit, o, table) if maximizing else value(x, o | bit, table)
+        if best is None or (v > best if maximizing else v < best):
+            best = v
+            move = bit
+    return divmod(move.bit_length() - 1, 3)
+
+
+def value(x, o, table=True):
+    """
+    Returns the minimax value of the position.
+    """
+    global nodes_searched
+    nodes_searched += 1
+
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    empty = FULL ^ (x | o)
+    if not empty:
+        return 0
+
+    if table:
+        key = x << 9 | o
+        v = transpositions.get(key)
+        if v is not None:
+            return v
+
+    if COUNT[x] == COUNT[o]:
+        v = -1
+        for bit in CELLS[empty]:
+            temp = value(x | bit, o, table)
+            if temp > v:
+                v = temp
+    else:
+        v = 1
+        for bit in CELLS[empty]:
+            temp = value(x, o | bit, table)
+            if temp < v:
+                v = temp
+
+    if table:
+        transpositions[key] = v
+    return v
+
+
+def clear_table():
+    transpositions.clear()
+
+
+def reset_nodes():
+    """
+    Resets nodes_searched and returns its previous value.
+    """
+    global nodes_searched
+    count = nodes_searched
+    nodes_searched = 0
+    return count
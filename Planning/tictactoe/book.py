@@ -0,0 +1,83 @@
+"""
+Perfect-play opening book for Tic Tac Toe.
+
+Solves every position reachable from the empty board once and writes the
+optimal move and game value of each to tictactoe.book: a short header then
+one byte per base-3 board key (tictactoe.board_key), 0 for unreachable
+positions. tictactoe.load_book reads it back so minimax can answer any
+position with a single lookup.
+
+Usage: python3 book.py [path]
+"""
+
+import os
+import sys
+import time
+
+import bitboard
+import tictactoe as ttt
+
+
+def entry(move, value):
+    """
+    Encodes a move (i, j), or None in terminal positions, and a value in
+    -1..1 as one nonzero byte.
+    """
+    cell = 9 if move is None else move[0] * 3 + move[1]
+    return 1 + (value + 1) * 10 + cell
+
+
+def build():
+    """
+    Returns the book as a bytearray of ttt.BOOK_SIZE entries.
+    """
+    entries = bytearray(ttt.BOOK_SIZE)
+    bitboard.clear_table()
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = ttt.board_key(board)
+        if entries[key]:
+            continue
+        state = bitboard.from_board(board)
+        if bitboard.terminal(state):
+            entries[key] = entry(None, bitboard.utility(state))
+            continue
+        x, o = state
+        entries[key] = entry(bitboard.minimax(state), bitboard.value(x, o))
+        for action in ttt.actions(board):
+            stack.append(ttt.result(board, action))
+    bitboard.reset_nodes()
+    return entries
+
+
+def save(entries, path=ttt.BOOK_FILE):
+    """
+    Writes the book to a temporary file next to `path` and moves it into place.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(ttt.BOOK_MAGIC)
+        f.write(entries)
+    os.replace(tmp, path)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else ttt.BOOK_FILE
+
+    start = time.perf_counter()
+    entries = build()
+    save(entries, path)
+    positions = sum(1 for e in entries if e)
+    print(f"Solved {positions} positions in {time.perf_counter() - start:.2f}s, "
+          f"wrote {os.path.getsize(path)} bytes to {path}")
+
+    ttt.book = None
+    start = time.perf_counter()
+    if not ttt.load_book(path):
+        sys.exit("Could not read the book back")
+    print(f"Loaded in {(time.perf_counter() - start) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares the minimax search modes on every reachable position.
+
+For each search mode it reports the nodes searched and the time taken from
+the empty board and over all positions, and checks that every move chosen
+by the other modes is worth exactly as much as the one chosen by plain
+minimax.
+
+Usage: python3 compare.py [--table]
+"""
+
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def reachable_positions():
+    """
+    Returns every non-terminal position reachable from the empty board.
+    """
+    positions = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = ttt.board_key(board)
+        if key in positions or ttt.terminal(board):
+            continue
+        positions[key] = board
+        for action in ttt.actions(board):
+            stack.append(ttt.result(board, action))
+    return list(positions.values())
+
+
+def run(mode, positions, table):
+    """
+    Returns (nodes from the empty board, seconds, total nodes, seconds,
+    chosen moves) for one search mode.
+    """
+    ttt.clear_table()
+    ttt.reset_nodes()
+    start = time.perf_counter()
+    ttt.minimax(ttt.initial_state(), mode, table)
+    empty_time = time.perf_counter() - start
+    empty_nodes = ttt.reset_nodes()
+
+    ttt.clear_table()
+    moves = []
+    start = time.perf_counter()
+    for board in positions:
+        moves.append(ttt.minimax(board, mode, table))
+    total_time = time.perf_counter() - start
+    return empty_nodes, empty_time, ttt.reset_nodes(), total_time, moves
+
+
+def main():
+    table = "--table" in sys.argv[1:]
+    positions = reachable_positions()
+    print(f"{len(positions)} positions, transposition table {'on' if table else 'off'}")
+
+    results = {}
+    for mode in (ttt.PLAIN, ttt.ALPHA_BETA, ttt.BITBOARD):
+        empty_nodes, empty_time, nodes, seconds, moves = run(mode, positions, table)
+        results[mode] = moves
+        print(f"{mode:>10}: empty board {empty_nodes:>8} nodes {empty_time:8.3f}s, "
+              f"all positions {nodes:>9} nodes {seconds:8.3f}s")
+
+    # judge both choices with the same exact values
+    ttt.clear_table()
+    mismatches = 0
+    for mode in (ttt.ALPHA_BETA, ttt.BITBOARD):
+        for board, plain, other in zip(positions, results[ttt.PLAIN], results[mode]):
+            if ttt.value(ttt.result(board, plain)) != ttt.value(ttt.result(board, other)):
+                mismatches += 1
+    print(f"Moves with a different value: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Monte Carlo Tree Search (UCT) Player
+
+An anytime alternative to minimax: the more rollouts (or seconds) it is
+given, the stronger it plays. It plays any game with the player, actions,
+result, terminal and utility functions of the tictactoe module, such as
+the module itself.
+
+Tree nodes hold only the move that led to them and their statistics, not
+a board. Each iteration replays the moves of the path it descends with
+result and plays its random rollout from there. On an mnk.Game, whose
+lines are known, it instead plays all of those moves on one flat scratch
+board and takes them back afterwards, as mnk.Game's alpha-beta does, so no
+boards are allocated while searching.
+
+The tree is kept between moves: when asked for the next move, the
+position reached after the opponent's reply is looked up among the
+grandchildren of the previous root and searching continues from there.
+"""
+
+import math
+import random
+import time
+
+import mnk
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# UCT exploration constant
+EXPLORATION = math.sqrt(2)
+
+# what a game passed to MCTS must provide
+GAME_FUNCTIONS = ("player", "actions", "result", "terminal", "utility")
+
+
+class Node():
+    __slots__ = ("move", "parent", "children", "untried", "player", "outcome", "visits", "wins")
+
+    def __init__(self, player, move=-1, parent=None, outcome=None):
+        # the move played to get here from the parent: its cell i * cols + j
+        # on an mnk.Game, otherwise the action itself
+        self.move = move
+        self.parent = parent
+        self.children = []
+        # moves not expanded yet: None until the node is first expanded,
+        # empty once it is fully expanded
+        self.untried = None
+        # player to move in this position
+        self.player = player
+        # utility if the game is over here, otherwise None
+        self.outcome = outcome
+        self.visits = 0
+        # rollout score for the player who moved into this position:
+        # 1 per win and 0.5 per tie
+        self.wins = 0.0
+
+
+class MCTS():
+    def __init__(self, game, rollouts=None, budget=None, seed=None):
+        """
+        Plays for `game` (an mnk.Game, the tictactoe module or anything
+        else with the GAME_FUNCTIONS), running `rollouts` simulations or for
+        `budget` seconds per move, whichever ends first (1 second if neither
+        is given). Raises TypeError if `game` lacks any of the functions.
+        """
+        missing = [name for name in GAME_FUNCTIONS if not callable(getattr(game, name, None))]
+        if missing:
+            raise TypeError(f"{game!r} can't be played: it has no {', '.join(missing)}")
+        if rollouts is None and budget is None:
+            budget = 1.0
+        self.game = game
+        # whether to play on a flat scratch board, see _iterate_cells
+        self.flat = isinstance(game, mnk.Game)
+        self.rollouts = rollouts
+        self.budget = budget
+        self.rng = random.Random(seed)
+        self.root = None
+        # the root position
+        self.root_board = None
+        # on an mnk.Game, the root position as a flat list of cells, and the
+        # scratch board every iteration plays on and restores
+        self.root_cells = None
+        self.cells = None
+
+        # statistics of the last move
+        self.rollouts_done = 0
+        self.nodes_created = 0
+        self.nodes_reused = 0
+        self.tree_size = 0
+        self.elapsed = 0.0
+
+    def reset(self):
+        """
+        Forgets the tree, e.g. before a new game.
+        """
+        self.root = None
+        self.root_board = None
+        self.root_cells = None
+
+    def choose(self, board):
+        """
+        Returns the action to play on the board: the most visited child of
+        the root after the search. Returns None if the game is over.
+        """
+        start = time.perf_counter()
+        deadline = math.inf if self.budget is None else start + self.budget
+        game = self.game
+
+        if self.flat:
+            cells = [e for row in board for e in row]
+            self.root = self._reroot_cells(cells)
+            self.root_cells = cells
+            self.cells = list(cells)
+        else:
+            self.root = self._reroot_board(board)
+        self.root_board = board
+        self.nodes_reused = self.tree_size = self._size(self.root)
+        self.nodes_created = 0
+        self.rollouts_done = 0
+        if self.root.outcome is not None:
+            return None
+
+        # always at least one rollout, so the root has a child to play
+        iterate = self._iterate_cells if self.flat else self._iterate_board
+        while True:
+            self._backpropagate(*iterate())
+            self.rollouts_done += 1
+            if self.rollouts is not None and self.rollouts_done >= self.rollouts:
+                break
+            if time.perf_counter() >= deadline:
+                break
+
+        self.tree_size = self.nodes_reused + self.nodes_created
+        self.elapsed = time.perf_counter() - start
+        best = max(self.root.children, key=lambda child: child.visits)
+        return divmod(best.move, game.cols) if self.flat else best.move
+
+    def stats(self):
+        """
+        Returns the work done for the last move, to compare with exhaustive
+        search.
+        """
+        return {
+            "rollouts": self.rollouts_done,
+            "nodes_created": self.nodes_created,
+            "nodes_reused": self.nodes_reused,
+            "tree_size": self.tree_size,
+            "seconds": self.elapsed,
+            "rollouts_per_second": self.rollouts_done / self.elapsed if self.elapsed else 0.0
+        }
+
+    def _iterate_board(self):
+        """
+        One selection, expansion and rollout through the game's functions.
+        Returns the node reached in the tree and the rollout's utility.
+        """
+        game = self.game
+        board = self.root_board
+        node = self.root
+
+        # selection: descend through fully expanded nodes
+        while node.untried is not None and not node.untried and node.children:
+            node = self._select(node)
+            board = game.result(board, node.move)
+
+        # expansion: add one untried action
+        if node.outcome is None:
+            if node.untried is None:
+                node.untried = list(game.actions(board))
+            untried = node.untried
+            i = self.rng.randrange(len(untried))
+            move = untried[i]
+            untried[i] = untried[-1]
+            untried.pop()
+            board = game.result(board, move)
+            child = Node(game.player(board), move, node,
+                         game.utility(board) if game.terminal(board) else None)
+            node.children.append(child)
+            self.nodes_created += 1
+            node = child
+
+        # rollout: random moves to the end of the game
+        score = node.outcome
+        while score is None:
+            board = game.result(board, self.rng.choice(list(game.actions(board))))
+            if game.terminal(board):
+                score = game.utility(board)
+        return node, score
+
+    def _iterate_cells(self):
+        """
+        _iterate_board on an mnk.Game, playing every move on the scratch
+        board and taking them all back at the end.
+        """
+        cells = self.cells
+        played = []
+        node = self.root
+
+        # selection: descend through fully expanded nodes
+        while node.untried is not None and not node.untried and node.children:
+            node = self._select(node)
+            cells[node.move] = node.parent.player
+            played.append(node.move)
+
+        # expansion: add one untried action
+        if node.outcome is None:
+            if node.untried is None:
+                node.untried = [c for c in self.game.order if cells[c] == EMPTY]
+            untried = node.untried
+            i = self.rng.randrange(len(untried))
+            move = untried[i]
+            untried[i] = untried[-1]
+            untried.pop()
+            stone = node.player
+            cells[move] = stone
+            played.append(move)
+            child = Node(O if stone == X else X, move, node, self._outcome(cells, move, stone))
+            node.children.append(child)
+            self.nodes_created += 1
+            node = child
+
+        # rollout: random moves to the end of the game
+        score = node.outcome
+        if score is None:
+            empty = [c for c in range(len(cells)) if cells[c] == EMPTY]
+            stone = node.player
+            while score is None:
+                i = self.rng.randrange(len(empty))
+                move = empty[i]
+                empty[i] = empty[-1]
+                empty.pop()
+                cells[move] = stone
+                played.append(move)
+                score = self._outcome(cells, move, stone, empty)
+                stone = O if stone == X else X
+
+        for move in played:
+            cells[move] = EMPTY
+        return node, score
+
+    def _backpropagate(self, node, score):
+        """
+        Adds the rollout's utility to the statistics of the node and every
+        node above it.
+        """
+        while node is not None:
+            node.visits += 1
+            if score == 0:
+                node.wins += 0.5
+            elif (score == 1) == (node.player == O):
+                # the player who moved into this node, not the one to move, won
+                node.wins += 1
+            node = node.parent
+
+    def _outcome(self, cells, move, stone, empty=None):
+        """
+        Returns the utility of the game after `stone` played `move` on the
+        cells, or None if it goes on. `empty` lists the cells still empty,
+        if the caller keeps track of them.
+        """
+        for line in self.game.cell_lines[move]:
+            if all(cells[c] == stone for c in line):
+                return 1 if stone == X else -1
+        if empty is None:
+            return None if EMPTY in cells else 0
+        return None if empty else 0
+
+    def _select(self, node):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(node.visits)
+        best = None
+        best_bound = -math.inf
+        for child in node.children:
+            bound = child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+            if bound > best_bound:
+                best = child
+                best_bound = bound
+        return best
+
+    def _reroot_board(self, board):
+        """
+        Returns the node of the board if it is the current root or within
+        two moves of it, detached from its parent, or a new root if it isn't
+        there.
+        """
+        game = self.game
+        if self.root is not None:
+            if board == self.root_board:
+                return self.root
+            for child in self.root.children:
+                after = game.result(self.root_board, child.move)
+                if after == board:
+                    return self._detach(child)
+                for grandchild in child.children:
+                    if game.result(after, grandchild.move) == board:
+                        return self._detach(grandchild)
+        return self._new_root(board)
+
+    def _reroot_cells(self, cells):
+        """
+        _reroot_board on an mnk.Game, for the board as a flat list of cells.
+        """
+        if self.root is not None and len(cells) == len(self.root_cells):
+            added = []
+            for c, (before, after) in enumerate(zip(self.root_cells, cells)):
+                if before != after:
+                    if before != EMPTY:
+                        added = None
+                        break
+                    added.append(c)
+            if added is not None and len(added) <= 2:
+                node = self.root
+                # the stone of the player to move at the root comes first
+                added.sort(key=lambda c: cells[c] != node.player)
+                for move in added:
+                    node = next((child for child in node.children if child.move == move), None)
+                    if node is None or cells[move] != node.parent.player:
+                        break
+                else:
+                    return self._detach(node)
+
+        game = self.game
+        return self._new_root([cells[i * game.cols:(i + 1) * game.cols] for i in range(game.rows)])
+
+    def _new_root(self, board):
+        game = self.game
+        return Node(game.player(board), outcome=game.utility(board) if game.terminal(board) else None)
+
+    def _detach(self, node):
+        node.parent = None
+        node.move = -1
+        return node
+
+    def _size(self, node):
+        count = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children)
+        return count
@@ -0,0 +1,375 @@
+"""
+m,n,k-game Player
+
+Tic Tac Toe generalized to a board of `rows` x `cols` cells where a player
+wins with `k` in a row horizontally, vertically or diagonally. Boards use
+the same lists of lists as tictactoe.py, so Game(3, 3, 3) plays ordinary
+Tic Tac Toe.
+
+Full minimax is infeasible past 3x3, so Game.search runs iterative
+deepening alpha-beta within a time budget: each completed depth gives a
+best move, non-terminal positions at the depth limit are scored by a
+heuristic, and when time runs out the best move of the deepest completed
+iteration is returned. ParallelSearch splits a fixed-depth search at the
+root across a process pool.
+
+Usage: python3 mnk.py [--rows M] [--cols N] [-k K] [--budget SECONDS]
+"""
+
+import argparse
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a win; wins found sooner score higher, heuristic values stay below
+WIN = 1000000
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+    def __init__(self, rows=3, cols=3, k=3):
+        if rows < 1 or cols < 1 or not 1 <= k <= max(rows, cols):
+            raise ValueError(f"invalid board {rows}x{cols} with {k} in a row")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+
+        # every run of k cells (as indices i * cols + j) that wins the game
+        self.lines = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        self.lines.append(tuple((i + di * s) * cols + j + dj * s for s in range(k)))
+        # the lines through each cell, the only ones a move there can complete
+        self.cell_lines = [[] for _ in range(rows * cols)]
+        for line in self.lines:
+            for c in line:
+                self.cell_lines[c].append(line)
+        # heuristic value of an open line holding 0..k stones of one player
+        self.weights = [0] + [4 ** (n - 1) for n in range(1, k + 1)]
+        # cells in the most lines first, then those closest to the center
+        self.order = sorted(range(rows * cols), key=lambda c: (
+            -len(self.cell_lines[c]),
+            abs(c // cols - (rows - 1) / 2) + abs(c % cols - (cols - 1) / 2),
+            c))
+
+        self.nodes_searched = 0
+        self.depth_reached = 0
+        # whether the current iteration scored any position by the heuristic
+        self._cut = False
+        # event that stops the current search when set
+        self._cancel = None
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.cols for _ in range(self.rows)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        moves = sum(e != EMPTY for row in board for e in row)
+        return X if moves % 2 == 0 else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i, row in enumerate(board) for j, e in enumerate(row) if e == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.rows and 0 <= j < self.cols) or board[i][j] != EMPTY:
+            raise ValueError(f"invalid action {action}")
+        new_board = [list(row) for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = self._flatten(board)
+        for line in self.lines:
+            first = cells[line[0]]
+            if first != EMPTY and all(cells[c] == first for c in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.winner(board) is not None or all(e != EMPTY for row in board for e in row)
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        w = self.winner(board)
+        return 1 if w == X else -1 if w == O else 0
+
+    def evaluate(self, board):
+        """
+        Heuristic value of a non-terminal board from X's point of view: every
+        line still open to only one player counts for that player, more the
+        more of its cells they hold.
+        """
+        return self._evaluate(self._flatten(board))
+
+    def search(self, board, budget=1.0, max_depth=None, cancel=None):
+        """
+        Returns (action, value, depth) for the current player: the best move
+        and its value found by iterative deepening within `budget` seconds
+        (None for no limit), and the deepest search depth completed. A value
+        of at least WIN - depth (or at most depth - WIN) is a forced win for
+        X (or O). Setting the `cancel` event (a threading.Event) from another
+        thread stops the search like the deadline does.
+        Returns (None, utility, 0) if the game is over.
+        """
+        self.nodes_searched = 0
+        self.depth_reached = 0
+        self._cancel = cancel
+        cells = self._flatten(board)
+        if self.terminal(board):
+            return None, self.utility(board), 0
+
+        deadline = time.perf_counter() + (math.inf if budget is None else budget)
+        maximizing = self.player(board) == X
+        empty = [c for c in self.order if cells[c] == EMPTY]
+        max_depth = len(empty) if max_depth is None else min(max_depth, len(empty))
+
+        # without a completed iteration, any legal move is better than none
+        best, value = empty[0], 0
+        for depth in range(1, max_depth + 1):
+            self._cut = False
+            try:
+                v, move = self._root(cells, empty, best, depth, maximizing, deadline)
+            except Timeout:
+                break
+            best, value = move, v
+            self.depth_reached = depth
+            # stop once the outcome is known or nothing was cut by the depth limit
+            if abs(v) >= WIN - max_depth or not self._cut:
+                break
+        return divmod(best, self.cols), value, self.depth_reached
+
+    def _root(self, cells, empty, first, depth, maximizing, deadline):
+        """
+        Searches every move at the root, the previous best move first.
+        """
+        stone = X if maximizing else O
+        alpha, beta = -WIN - 1, WIN + 1
+        move = None
+        for c in [first] + [c for c in empty if c != first]:
+            cells[c] = stone
+            try:
+                v = self._alpha_beta(cells, c, depth - 1, 1, alpha, beta, not maximizing, deadline)
+            finally:
+                cells[c] = EMPTY
+            if move is None or (v > alpha if maximizing else v < beta):
+                move = c
+                if maximizing:
+                    alpha = max(alpha, v)
+                else:
+                    beta = min(beta, v)
+        return (alpha if maximizing else beta), move
+
+    def _alpha_beta(self, cells, last, depth, ply, alpha, beta, maximizing, deadline):
+        """
+        Depth-limited alpha-beta on a flat list of cells, where `last` is the
+        cell just played. Moves are made and undone in place.
+        """
+        self.nodes_searched += 1
+        if time.perf_counter() > deadline or (self._cancel is not None and self._cancel.is_set()):
+            raise Timeout
+
+        # only the last move can have won the game
+        stone = cells[last]
+        for line in self.cell_lines[last]:
+            if all(cells[c] == stone for c in line):
+                return WIN - ply if stone == X else ply - WIN
+        empty = [c for c in self.order if cells[c] == EMPTY]
+        if not empty:
+            return 0
+        if depth == 0:
+            self._cut = True
+            return self._evaluate(cells)
+
+        stone = X if maximizing else O
+        v = -WIN - 1 if maximizing else WIN + 1
+        for c in empty:
+            cells[c] = stone
+            try:
+                temp = self._alpha_beta(cells, c, depth - 1, ply + 1, alpha, beta, not maximizing, deadline)
+            finally:
+                cells[c] = EMPTY
+            if maximizing:
+                v = max(v, temp)
+                alpha = max(alpha, v)
+            else:
+                v = min(v, temp)
+                beta = min(beta, v)
+            if alpha >= beta:
+                break
+        return v
+
+    def _evaluate(self, cells):
+        score = 0
+        for line in self.lines:
+            x_count = o_count = 0
+            for c in line:
+                if cells[c] == X:
+                    x_count += 1
+                elif cells[c] == O:
+                    o_count += 1
+            if not o_count:
+                score += self.weights[x_count]
+            elif not x_count:
+                score -= self.weights[o_count]
+        return score
+
+    def _flatten(self, board):
+        return [e for row in board for e in row]
+
+
+class ParallelSearch():
+    """
+    Root-parallel alpha-beta: every move of the root is searched as its own
+    task on a process pool. The best value found so far is kept in shared
+    memory and each task starts with it as its bound, so moves that can't
+    beat it are cut off as in a sequential search.
+    """
+
+    def __init__(self, game, workers):
+        self.game = game
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        # best root value so far, from X's point of view
+        self.bound = context.Value("q", 0)
+        self.pool = ProcessPoolExecutor(workers, mp_context=context,
+                                        initializer=_init_worker,
+                                        initargs=(game.rows, game.cols, game.k, self.bound))
+        self.nodes_searched = 0
+
+    def search(self, board, depth=None):
+        """
+        Returns (action, value) of a depth-limited alpha-beta search (to the
+        end of the game if depth is None), with ties between equally good
+        moves broken by Game.order so the result doesn't depend on which
+        worker finishes first. Returns (None, utility) if the game is over.
+        """
+        game = self.game
+        self.nodes_searched = 0
+        if game.terminal(board):
+            return None, game.utility(board)
+
+        cells = game._flatten(board)
+        maximizing = game.player(board) == X
+        empty = [c for c in game.order if cells[c] == EMPTY]
+        depth = len(empty) if depth is None else max(1, min(depth, len(empty)))
+        # one below any reachable value, so the first result always beats it
+        self.bound.value = -WIN - 2 if maximizing else WIN + 2
+
+        futures = [self.pool.submit(_search_root_move, cells, c, depth, maximizing) for c in empty]
+        results = [future.result() for future in futures]
+
+        best = None
+        for c, (v, exact, nodes) in zip(empty, results):
+            self.nodes_searched += nodes
+            # a move that failed against the bound is worse than the best move
+            if exact and (best is None or (v > best[1] if maximizing else v < best[1])):
+                best = (c, v)
+        return divmod(best[0], game.cols), best[1]
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Game and shared bound of a ParallelSearch worker process
+_worker_game = None
+_worker_bound = None
+
+
+def _init_worker(rows, cols, k, bound):
+    global _worker_game, _worker_bound
+    _worker_game = Game(rows, cols, k)
+    _worker_bound = bound
+
+
+def _search_root_move(cells, c, depth, maximizing):
+    """
+    Searches root move `c` with the current shared bound. Returns (value,
+    whether the value is exact, nodes searched). The window starts one below
+    the bound, so a move as good as the best so far still gets its exact
+    value and ties can be broken by move order.
+    """
+    game = _worker_game
+    game.nodes_searched = 0
+    bound = _worker_bound.value
+    if maximizing:
+        alpha, beta = bound - 1, WIN + 1
+    else:
+        alpha, beta = -WIN - 1, bound + 1
+
+    cells[c] = X if maximizing else O
+    v = game._alpha_beta(cells, c, depth - 1, 1, alpha, beta, not maximizing, math.inf)
+    exact = alpha < v < beta
+    if exact:
+        with _worker_bound.get_lock():
+            if v > _worker_bound.value if maximizing else v < _worker_bound.value:
+                _worker_bound.value = v
+    return v, exact, game.nodes_searched
+
+
+def show(board):
+    return "\n".join(" ".join(e or "." for e in row) for row in board)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Computer vs computer m,n,k-game.")
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("-k", type=int, default=4, help="stones in a row needed to win")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per move")
+    args = parser.parse_args()
+
+    game = Game(args.rows, args.cols, args.k)
+    board = game.initial_state()
+    while not game.terminal(board):
+        start = time.perf_counter()
+        move, value, depth = game.search(board, args.budget)
+        elapsed = time.perf_counter() - start
+        print(f"{game.player(board)} plays {move}: depth {depth}, value {value}, "
+              f"{game.nodes_searched} nodes in {elapsed:.2f}s")
+        board = game.result(board, move)
+        print(show(board), end="\n\n")
+
+    w = game.winner(board)
+    print(f"Game Over: {w} wins." if w else "Game Over: Tie.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures how root-parallel search scales with the number of worker
+processes on an m,n,k board.
+
+Searches a few positions (the empty board and some random openings) to a
+fixed depth with 1, 2, 4, ... up to N workers, reporting time, speedup over
+one worker and nodes searched, and checks that every worker count picks the
+same moves and values as each other and as the sequential Game.search.
+
+Usage: python3 parallel_benchmark.py [--rows M] [--cols N] [-k K] [--depth D]
+                                     [--positions P] [-w WORKERS]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import mnk
+
+
+def positions(game, count, seed=0):
+    """
+    Returns the empty board and count - 1 boards after a few random moves.
+    """
+    rng = random.Random(seed)
+    boards = [game.initial_state()]
+    while len(boards) < count:
+        board = game.initial_state()
+        for _ in range(rng.randint(1, 4)):
+            board = game.result(board, rng.choice(sorted(game.actions(board))))
+        if not game.terminal(board):
+            boards.append(board)
+    return boards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Root-parallel search scaling benchmark.")
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("-k", type=int, default=4, help="stones in a row needed to win")
+    parser.add_argument("--depth", type=int, default=6, help="search depth (default: 6)")
+    parser.add_argument("--positions", type=int, default=4, help="positions to search (default: 4)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="largest number of workers (default: number of cores)")
+    args = parser.parse_args()
+
+    game = mnk.Game(args.rows, args.cols, args.k)
+    boards = positions(game, args.positions)
+
+    start = time.perf_counter()
+    expected = []
+    nodes = 0
+    for board in boards:
+        _, value, _ = game.search(board, None, max_depth=args.depth)
+        expected.append(value)
+        nodes += game.nodes_searched
+    sequential = time.perf_counter() - start
+    print(f"{args.rows}x{args.cols}, {args.k} in a row, depth {args.depth}, "
+          f"{len(boards)} positions, {os.cpu_count()} cores")
+    print(f"{'sequential':>10}: {sequential:8.2f}s {nodes:>10} nodes")
+
+    counts = []
+    workers = 1
+    while workers < args.workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(args.workers)
+
+    baseline = None
+    reference = None
+    for workers in counts:
+        with mnk.ParallelSearch(game, workers) as parallel:
+            # start the workers before timing
+            parallel.search(boards[0], 1)
+            start = time.perf_counter()
+            results = []
+            nodes = 0
+            for board in boards:
+                results.append(parallel.search(board, args.depth))
+                nodes += parallel.nodes_searched
+            elapsed = time.perf_counter() - start
+
+        if [value for _, value in results] != expected:
+            sys.exit(f"{workers} workers disagree with the sequential search on values")
+        if reference is None:
+            reference = results
+        elif results != reference:
+            sys.exit(f"{workers} workers picked different moves than 1 worker")
+        baseline = baseline or elapsed
+        print(f"{workers:>3} workers: {elapsed:8.2f}s {nodes:>10} nodes, "
+              f"speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
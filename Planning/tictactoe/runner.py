@@ -1,9 +1,51 @@
+import argparse
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import mnk
 import tictactoe as ttt
 
+parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe against the computer.")
+parser.add_argument("--budget", type=float, default=None,
+                    help="seconds the computer may think per move; it plays the best "
+                         "move found so far when time runs out (default: no limit)")
+args = parser.parse_args()
+
+# answer from the opening book if book.py has written one
+ttt.load_book()
+
+# the AI searches on a worker thread so the window keeps responding
+executor = ThreadPoolExecutor(max_workers=1)
+search_game = mnk.Game(3, 3, 3)
+
+
+def ai_move(board, cancel):
+    """
+    Runs on the worker thread. The move comes from the opening book if it
+    has the board, otherwise from iterative deepening, which runs to the end
+    of the game without a budget. The search stops at the budget or as soon
+    as `cancel` is set, so an abandoned move doesn't hold up the next one.
+    """
+    entry = ttt.book_lookup(board)
+    if entry is not None:
+        return entry[0]
+    return search_game.search(board, args.budget, cancel=cancel)[0]
+
+
+def cancel_ai():
+    """
+    Abandons the move being computed, if any.
+    """
+    global ai_future
+    if ai_future is not None:
+        ai_cancel.set()
+        ai_future.cancel()
+        ai_future = None
+
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -17,14 +59,21 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+FPS = 60
+clock = pygame.time.Clock()
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+ai_future = None
+ai_cancel = threading.Event()
+ai_started = 0
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
 
     screen.fill(black)
@@ -102,7 +151,9 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            # animate the dots so it's visible that the window isn't frozen
+            dots = int((time.perf_counter() - ai_started) * 3) % 4
+            title = f"Computer thinking{'.' * dots}{' ' * (3 - dots)}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,13 +161,14 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                ai_cancel = threading.Event()
+                ai_future = executor.submit(ai_move, board, ai_cancel)
+                ai_started = time.perf_counter()
+            elif ai_future.done():
+                move = ai_future.result()
+                ai_future = None
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +193,7 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    cancel_ai()
 
     pygame.display.flip()
+    clock.tick(FPS)
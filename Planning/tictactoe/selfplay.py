@@ -0,0 +1,205 @@
+"""
+Headless Tic Tac Toe self-play and benchmark harness.
+
+Plays N games between two agents without pygame, spreading the games over a
+process pool, and writes one JSON document to stdout with the outcome counts
+and, per agent, the moves played, per-move latency percentiles and the
+nodes searched. Keys are sorted so results from two versions can be diffed.
+
+Every game starts from empty transposition tables and a seed of its own, so
+results don't depend on the number of workers or which worker plays a game.
+
+Agents:
+    minimax     tictactoe.minimax, full search
+    alphabeta   tictactoe.minimax with alpha-beta pruning
+    bitboard    tictactoe.minimax on the bitboard representation
+    book        tictactoe.minimax answering from the opening book
+    deepening   mnk iterative deepening within --budget seconds
+    mcts        Monte Carlo tree search with --rollouts per move, reusing
+                its tree between moves
+    random      a uniformly random legal move
+
+Usage: python3 selfplay.py [-n GAMES] [-x AGENT] [-o AGENT] [-w WORKERS]
+                           [--seed SEED] [--random-openings PLIES]
+                           [--budget SECONDS] [--rollouts N] [--no-table]
+                           [--records]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import book
+import mcts
+import mnk
+import tictactoe as ttt
+
+AGENTS = ("minimax", "alphabeta", "bitboard", "book", "deepening", "mcts", "random")
+
+PERCENTILES = (50, 90, 99)
+
+# m,n,k search used by the deepening agent, one per process
+game = mnk.Game(3, 3, 3)
+
+
+def choose(agent, board, rng, options, trees):
+    """
+    Returns (action, nodes searched) for `agent` to move on the board.
+    `trees` holds the MCTS player of each side for the current game; its
+    nodes are the tree nodes created for this move.
+    """
+    if agent == "random":
+        return rng.choice(sorted(ttt.actions(board))), 0
+    if agent == "mcts":
+        player = ttt.player(board)
+        if player not in trees:
+            trees[player] = mcts.MCTS(ttt, options["rollouts"], seed=rng.random())
+        move = trees[player].choose(board)
+        return move, trees[player].nodes_created
+    if agent == "deepening":
+        move, _, _ = game.search(board, options["budget"])
+        return move, game.nodes_searched
+
+    mode = {"minimax": ttt.PLAIN, "alphabeta": ttt.ALPHA_BETA, "bitboard": ttt.BITBOARD}
+    ttt.reset_nodes()
+    if agent == "book":
+        move = ttt.minimax(board)
+    else:
+        move = ttt.minimax(board, mode[agent], options["table"], use_book=False)
+    return move, ttt.reset_nodes()
+
+
+def play(job):
+    """
+    Plays one game. Returns its record: the winner and, for every move, the
+    player, the action, its latency in milliseconds and the nodes searched.
+    """
+    index, options = job
+    rng = random.Random(options["seed"] * 1000003 + index)
+    agents = {ttt.X: options["x"], ttt.O: options["o"]}
+    ttt.clear_table()
+
+    board = ttt.initial_state()
+    moves = []
+    trees = {}
+    while not ttt.terminal(board):
+        current = ttt.player(board)
+        agent = "random" if len(moves) < options["random_openings"] else agents[current]
+        start = time.perf_counter()
+        action, nodes = choose(agent, board, rng, options, trees)
+        latency = (time.perf_counter() - start) * 1000
+        moves.append({"player": current, "agent": agent, "action": list(action),
+                      "ms": latency, "nodes": nodes})
+        board = ttt.result(board, action)
+
+    return {"game": index, "winner": ttt.winner(board), "moves": moves}
+
+
+def init_worker(options):
+    """
+    Makes sure the book agent has a book, building one in memory if
+    tictactoe.book is missing.
+    """
+    if "book" in (options["x"], options["o"]) and ttt.book is None and not ttt.load_book():
+        ttt.book = bytes(book.build())
+
+
+def percentile(values, q):
+    """
+    Nearest-rank q-th percentile of sorted values.
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def summarize(records, options):
+    outcomes = {"X": 0, "O": 0, "tie": 0}
+    per_agent = {}
+    for record in records:
+        outcomes[record["winner"] or "tie"] += 1
+        for move in record["moves"]:
+            # random opening plies are not the agent's own moves
+            if move["agent"] == "random" and options[move["player"].lower()] != "random":
+                continue
+            name = f"{move['player']}:{move['agent']}"
+            stats = per_agent.setdefault(name, {"ms": [], "nodes": []})
+            stats["ms"].append(move["ms"])
+            stats["nodes"].append(move["nodes"])
+
+    agents = {}
+    for name, stats in sorted(per_agent.items()):
+        ms = sorted(stats["ms"])
+        agents[name] = {
+            "moves": len(ms),
+            "total_ms": sum(ms),
+            "mean_ms": sum(ms) / len(ms),
+            "max_ms": ms[-1],
+            "nodes": sum(stats["nodes"]),
+            "mean_nodes": sum(stats["nodes"]) / len(ms),
+        } | {f"p{q}_ms": percentile(ms, q) for q in PERCENTILES}
+
+    return {"options": options, "outcomes": outcomes, "agents": agents}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tic Tac Toe self-play benchmark.")
+    parser.add_argument("-n", "--games", type=int, default=100, help="games to play (default: 100)")
+    parser.add_argument("-x", choices=AGENTS, default="minimax", help="agent playing X")
+    parser.add_argument("-o", choices=AGENTS, default="random", help="agent playing O")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: number of cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-openings", type=int, default=0, metavar="PLIES",
+                        help="play the first PLIES moves of each game at random")
+    parser.add_argument("--budget", type=float, default=0.1,
+                        help="seconds per move for the deepening agent (default: 0.1)")
+    parser.add_argument("--rollouts", type=int, default=1000,
+                        help="rollouts per move for the mcts agent (default: 1000)")
+    parser.add_argument("--no-table", dest="table", action="store_false",
+                        help="search without the transposition table")
+    parser.add_argument("--records", action="store_true",
+                        help="include every game's moves in the output")
+    args = parser.parse_args()
+
+    options = {
+        "games": args.games,
+        "x": args.x,
+        "o": args.o,
+        "seed": args.seed,
+        "random_openings": args.random_openings,
+        "budget": args.budget,
+        "rollouts": args.rollouts,
+        "table": args.table
+    }
+    jobs = [(index, options) for index in range(args.games)]
+
+    start = time.perf_counter()
+    if args.workers <= 1 or args.games <= 1:
+        init_worker(options)
+        records = list(map(play, jobs))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(args.workers, initializer=init_worker, initargs=(options,)) as pool:
+            records = pool.map(play, jobs)
+    elapsed = time.perf_counter() - start
+
+    results = summarize(records, options)
+    if args.records:
+        results["records"] = records
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+    outcomes = results["outcomes"]
+    print(f"{args.games} games in {elapsed:.2f}s: X {outcomes['X']}, O {outcomes['O']}, "
+          f"tie {outcomes['tie']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
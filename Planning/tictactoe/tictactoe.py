@@ -3,12 +3,60 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+import functools
+import os
+from collections import namedtuple
+
+import bitboard
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# The 8 rotations and reflections of the board, each as the list of cell
+# indices (i * 3 + j) read off the original board in the transformed order
+SYMMETRIES = []
+for _flip in (False, True):
+    _cells = [[i * 3 + j for j in range(3)] for i in range(3)]
+    if _flip:
+        _cells = [row[::-1] for row in _cells]
+    for _ in range(4):
+        SYMMETRIES.append([c for row in _cells for c in row])
+        # rotate 90 degrees clockwise
+        _cells = [list(row) for row in zip(*_cells[::-1])]
+
+# Search modes accepted by minimax
+PLAIN = "plain"
+ALPHA_BETA = "alphabeta"
+BITBOARD = "bitboard"
+
+# Moves in the order alpha-beta tries them: center, corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Opening book written by book.py: BOOK_MAGIC, then one byte per board key
+# holding 1 + (value + 1) * 10 + cell of the optimal move (9 for no move),
+# or 0 for positions that can't be reached
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+BOOK_MAGIC = b"TTTBOOK1"
+BOOK_SIZE = 3 ** 9
+book = None
+
+# Everything the search needs to know about a position, found in one pass
+# over its cells: actions is a tuple in MOVE_ORDER and canonical its
+# canonical_key. Cached per board key, and there are only 3^9 of those.
+Evaluation = namedtuple("Evaluation", "winner terminal player utility actions canonical")
+EVALUATION_CACHE_SIZE = 3 ** 9
+CELL_CODES = {EMPTY: 0, X: 1, O: 2}
+
+# Number of positions expanded by max_value, min_value and alpha_beta
+nodes_searched = 0
+
+# Transposition table: canonical board key -> minimax value. It lives for
+# the whole process, so every minimax call reuses what earlier ones solved.
+transpositions = {}
+table_hits = 0
+table_misses = 0
+
 
 def initial_state():
     """
@@ -50,13 +98,14 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
+    ev = evaluation(board)
     # check if action is a valid action in the board
-    if action not in actions(board):
+    if action not in ev.actions:
         raise Exception
     # make sure that the original board is left unmodified
-    newBoard = copy.deepcopy(board)
+    newBoard = [list(row) for row in board]
     # return new board
-    newBoard[action[0]][action[1]] = player(board)
+    newBoard[action[0]][action[1]] = ev.player
     return newBoard
 
 
@@ -115,33 +164,196 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def board_key(board, symmetry=SYMMETRIES[0]):
+    """
+    Returns the board, seen through one of SYMMETRIES, as a base-3 integer.
+    """
+    cells = [e for row in board for e in row]
+    key = 0
+    for c in symmetry:
+        e = cells[c]
+        key = key * 3 + (0 if e == EMPTY else 1 if e == X else 2)
+    return key
+
+
+def canonical_key(board):
+    """
+    Returns the same key for all 8 rotations and reflections of a board.
+    """
+    return min(board_key(board, symmetry) for symmetry in SYMMETRIES)
+
+
+def evaluation(board):
+    """
+    Returns the Evaluation of the board from the cache.
+    """
+    key = 0
+    for row in board:
+        for e in row:
+            key = key * 3 + CELL_CODES[e]
+    return _evaluate(key)
+
+
+@functools.lru_cache(maxsize=EVALUATION_CACHE_SIZE)
+def _evaluate(key):
+    cells = []
+    for _ in range(9):
+        key, digit = divmod(key, 3)
+        cells.append((EMPTY, X, O)[digit])
+    cells.reverse()
+    board = [cells[0:3], cells[3:6], cells[6:9]]
+    w = winner(board)
+    moves = tuple(a for a in MOVE_ORDER if board[a[0]][a[1]] == EMPTY)
+    return Evaluation(w, w is not None or not moves, player(board),
+                      utility(board), moves, canonical_key(board))
+
+
+def value(board, table=True):
+    """
+    Returns the minimax value of the board, using the transposition table
+    unless table is False.
+    """
+    global table_hits, table_misses
+    ev = evaluation(board)
+    if table:
+        key = ev.canonical
+        if key in transpositions:
+            table_hits += 1
+            return transpositions[key]
+        table_misses += 1
+    if ev.player == X:
+        v = max_value(board, table)[0]
+    else:
+        v = min_value(board, table)[0]
+    if table:
+        transpositions[key] = v
+    return v
+
+
+def table_stats():
+    """
+    Returns the size and hit rate of the transposition table.
+    """
+    lookups = table_hits + table_misses
+    return {
+        "entries": len(transpositions),
+        "hits": table_hits,
+        "misses": table_misses,
+        "hit_rate": table_hits / lookups if lookups else 0.0,
+        "evaluations": _evaluate.cache_info()._asdict()
+    }
+
+
+def clear_table():
+    """
+    Empties the transposition table and resets its counters.
+    """
+    global table_hits, table_misses
+    transpositions.clear()
+    bitboard.clear_table()
+    table_hits = 0
+    table_misses = 0
+
+
+def reset_nodes():
+    """
+    Resets nodes_searched and returns its previous value.
+    """
+    global nodes_searched
+    count = nodes_searched
+    nodes_searched = 0
+    return count
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Loads the opening book so minimax answers from it. Returns False, leaving
+    minimax to search, if the file is missing or not a book.
+    """
+    global book
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+    if len(data) != len(BOOK_MAGIC) + BOOK_SIZE or not data.startswith(BOOK_MAGIC):
+        return False
+    book = data[len(BOOK_MAGIC):]
+    return True
+
+
+def book_lookup(board):
+    """
+    Returns (optimal action, value) of the board from the opening book, or
+    None if no book is loaded or the board isn't in it.
+    """
+    if book is None:
+        return None
+    e = book[board_key(board)]
+    if not e:
+        return None
+    value, cell = divmod(e - 1, 10)
+    return (None if cell == 9 else divmod(cell, 3)), value - 1
+
+
+def minimax(board, mode=PLAIN, table=True, use_book=True):
     """
     Returns the optimal action for the current player on the board.
+
+    If an opening book is loaded (see load_book) and use_book is True, the
+    move comes straight from the book; otherwise it is searched for.
+
+    mode is PLAIN for full minimax, ALPHA_BETA for alpha-beta pruning with
+    move ordering, or BITBOARD for full minimax on the bitboard module's
+    representation; all return equally optimal moves. With table set to
+    False the transposition table is neither read nor written.
     """
-    if terminal(board):
+    global nodes_searched
+    if evaluation(board).terminal:
         return None
 
-    if player(board) == X:
-        return max_value(board)[1]
+    if use_book:
+        entry = book_lookup(board)
+        if entry is not None:
+            return entry[0]
+
+    if mode == BITBOARD:
+        move = bitboard.minimax(bitboard.from_board(board), table)
+        nodes_searched += bitboard.reset_nodes()
+        return move
+    elif mode not in (PLAIN, ALPHA_BETA):
+        raise ValueError(f"unknown search mode {mode}")
+
+    # the search plays moves on its own copy, so board is never touched
+    board = [list(row) for row in board]
+    if mode == ALPHA_BETA:
+        return alpha_beta(board, float('-inf'), float('inf'), table)[1]
+    if evaluation(board).player == X:
+        return max_value(board, table)[1]
     else:
-        return min_value(board)[1]
+        return min_value(board, table)[1]
 
-def max_value(board):
+def max_value(board, table=True):
     """
-    produces biggest value of min value
+    produces biggest value of min value. Moves are played on the board and
+    taken back, so it is left as it was
     """
+    global nodes_searched
+    nodes_searched += 1
     
     # return the board and no move if the board is terminal
-    if terminal(board):
-        return (utility(board), None);
+    ev = evaluation(board)
+    if ev.terminal:
+        return (ev.utility, None);
     
     move = None
 
     v = float('-inf') # set the maximum to the bisggest value possible
-    for a in actions(board):
-        # get the maximum between the current maximum (v) and the restult of min_value for the current action
-        temp = min_value(result(board, a))[0]
+    for a in ev.actions:
+        # get the maximum between the current maximum (v) and the value of the board after the action
+        board[a[0]][a[1]] = ev.player
+        temp = value(board, table)
+        board[a[0]][a[1]] = EMPTY
         # if it's bigger than the current maximum, update value and optimal move
         if temp > v:
             v = temp
@@ -149,24 +361,93 @@ def max_value(board):
 
     return (v, move);
 
-def min_value(board):
+def min_value(board, table=True):
     """
-    produces smallest value of min value
+    produces smallest value of min value. Moves are played on the board and
+    taken back, so it is left as it was
     """
+    global nodes_searched
+    nodes_searched += 1
     
     # return the board and no move if the board is terminal
-    if terminal(board):
-        return (utility(board), None);
+    ev = evaluation(board)
+    if ev.terminal:
+        return (ev.utility, None);
 
     move = None
 
     v = float('inf') # set the minimum to the the biggest value possible
-    for a in actions(board):
-        # get the minimum between the current minimum (v) and the restult of max_value for the current action
-        temp = max_value(result(board, a))[0]
+    for a in ev.actions:
+        # get the minimum between the current minimum (v) and the value of the board after the action
+        board[a[0]][a[1]] = ev.player
+        temp = value(board, table)
+        board[a[0]][a[1]] = EMPTY
          # if it's smaller than the current minimum, update value and optimal move
         if temp < v:
             v = temp
             move = a
 
-    return (v, move);
\ No newline at end of file
+    return (v, move);
+
+
+def alpha_beta(board, alpha, beta, table=True):
+    """
+    produces the value and optimal move of the board with alpha-beta pruning.
+    The value is exact if it lies strictly between alpha and beta, otherwise
+    it is only a bound on the exact value. Moves are played on the board and
+    taken back, so it is left as it was
+    """
+    global nodes_searched
+    nodes_searched += 1
+
+    # return the board and no move if the board is terminal
+    ev = evaluation(board)
+    if ev.terminal:
+        return (ev.utility, None)
+
+    maximizing = ev.player == X
+    # best possible outcome for the player to move, no need to look further once found
+    proven = 1 if maximizing else -1
+
+    move = None
+    v = float('-inf') if maximizing else float('inf')
+    for a in ev.actions:
+        board[a[0]][a[1]] = ev.player
+        temp = alpha_beta_value(board, alpha, beta, table)
+        board[a[0]][a[1]] = EMPTY
+        if maximizing:
+            if temp > v:
+                v = temp
+                move = a
+            alpha = max(alpha, v)
+        else:
+            if temp < v:
+                v = temp
+                move = a
+            beta = min(beta, v)
+        # stop once the player can't do better or the opponent won't allow this line
+        if v == proven or alpha >= beta:
+            break
+
+    return (v, move)
+
+def alpha_beta_value(board, alpha, beta, table=True):
+    """
+    produces the alpha-beta value of the board, reading exact values from
+    and storing them into the transposition table
+    """
+    global table_hits, table_misses
+    ev = evaluation(board)
+    if table:
+        key = ev.canonical
+        if key in transpositions:
+            table_hits += 1
+            return transpositions[key]
+        table_misses += 1
+
+    v = alpha_beta(board, alpha, beta, table)[0]
+    # a proven win for the player to move is exact even when it caused a cutoff
+    proven = 1 if ev.player == X else -1
+    if table and (alpha < v < beta or v == proven or ev.terminal):
+        transpositions[key] = v
+    return v